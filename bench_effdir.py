@@ -0,0 +1,190 @@
+# bench_effdir.py
+# Benchmark harness for the effdir reader, writer and isolate.
+# Generates synthetic files (see synth_effdir) of the requested sizes, times
+# every case a few times and reports throughput (MB/s of effdir bytes,
+# entries/s) plus peak traced memory.  Each run is appended to a JSON
+# results file so numbers can be tracked over time.
+# Usage:
+#   python bench_effdir.py --entries 200 2000 --repeat 5
+#   python bench_effdir.py --cases read roundtrip edit --results bench_results.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from isolate_eff import isolate_eff
+from read_effdir import read_effdir
+from synth_effdir import write_synthetic
+from write_effdir import write_effdir
+
+MAX_ISOLATE = 100  # effects isolated per isolate run
+
+def _count_entries(effdir):
+    return sum(len(s.get("entry", ())) for s in effdir["sec"].values())
+
+# Each case: setup(path, workdir) -> (run, n_bytes, n_entries), where run()
+# does the timed work once.  n_bytes is None when MB/s is meaningless.
+
+def _case_read(path, workdir):
+    n = _count_entries(read_effdir(path))
+    return (lambda: read_effdir(path)), os.path.getsize(path), n
+
+def _case_read_mmap(path, workdir):
+    n = _count_entries(read_effdir(path))
+    return (lambda: read_effdir(path, use_mmap=True)), os.path.getsize(path), n
+
+def _case_read_parallel(path, workdir):
+    n = _count_entries(read_effdir(path))
+    return (lambda: read_effdir(path, processes=os.cpu_count())), os.path.getsize(path), n
+
+def _case_isolate(path, workdir):
+    effdir = read_effdir(path)
+    count = min(MAX_ISOLATE, len(effdir["sec"][13]["entry"]) - 1)
+
+    def run():
+        for i in range(1, count + 1):
+            isolate_eff(effdir, i, "bench")
+    return run, None, count
+
+def _case_write(path, workdir):
+    effdir = read_effdir(path)
+    out = os.path.join(workdir, "write.effdir")
+    return (lambda: write_effdir(effdir, out)), os.path.getsize(path), _count_entries(effdir)
+
+def _case_roundtrip(path, workdir):
+    out = os.path.join(workdir, "roundtrip.effdir")
+    n = _count_entries(read_effdir(path))
+    return (lambda: write_effdir(read_effdir(path), out)), os.path.getsize(path), n
+
+def _case_edit(path, workdir):
+    # change one field and write back; unmodified entries are span copies
+    out = os.path.join(workdir, "edit.effdir")
+    n = _count_entries(read_effdir(path))
+
+    def run():
+        effdir = read_effdir(path, spans=True)
+        for e in effdir["sec"][13]["entry"][:1]:
+            e["index_key"] = e["index_key"]
+        write_effdir(effdir, out)
+    return run, os.path.getsize(path), n
+
+CASES = {
+    "read": _case_read,
+    "read_mmap": _case_read_mmap,
+    "read_parallel": _case_read_parallel,
+    "isolate": _case_isolate,
+    "write": _case_write,
+    "roundtrip": _case_roundtrip,
+    "edit": _case_edit,
+}
+
+def _peak_memory(run):
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_case(name, path, workdir, repeat=3):
+    """Time one case on one file; returns a result dict (with "error" on failure)."""
+    result = {"case": name, "file": os.path.basename(path)}
+    try:
+        run, n_bytes, n_entries = CASES[name](path, workdir)
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t0)
+        peak = _peak_memory(run)
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        return result
+    best = min(times)
+    result.update({
+        "bytes": n_bytes,
+        "entries": n_entries,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "mb_per_s": n_bytes / best / 1e6 if best and n_bytes else None,
+        "entries_per_s": n_entries / best if best else None,
+        "peak_mb": peak / 1e6,
+    })
+    return result
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def run_benchmarks(sizes=(200,), cases=tuple(CASES), repeat=3, curve_len=8, str_len=12, fanout=4, seed=0):
+    """Generate one synthetic file per size and run every case on it."""
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {"sizes": list(sizes), "repeat": repeat, "curve_len": curve_len,
+                   "str_len": str_len, "fanout": fanout, "seed": seed},
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            path = os.path.join(workdir, f"synth_{size}.effdir")
+            write_synthetic(path, entries=size, curve_len=curve_len, str_len=str_len,
+                            fanout=fanout, seed=seed)
+            for name in cases:
+                res = bench_case(name, path, workdir, repeat)
+                res["size"] = size
+                run["results"].append(res)
+                _print_result(res)
+    return run
+
+def _print_result(res):
+    if "error" in res:
+        print(f"{res['case']:<10} {res['size']:>7}  skipped: {res['error']}")
+        return
+    mb_s = f"{res['mb_per_s']:8.2f}" if res["mb_per_s"] is not None else f"{'-':>8}"
+    print(f"{res['case']:<10} {res['size']:>7}  {res['best_s'] * 1e3:9.2f} ms  "
+          f"{mb_s} MB/s  {res['entries_per_s']:12.0f} entries/s  "
+          f"peak {res['peak_mb']:8.2f} MB")
+
+def append_results(filename, run):
+    """Append one run to the JSON results file (a list of runs)."""
+    history = []
+    if os.path.exists(filename):
+        with open(filename, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    history.append(run)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark effdir read/write/isolate")
+    parser.add_argument("--entries", type=int, nargs="+", default=[200, 2000],
+                        help="Entries per section of each synthetic file")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--curve-len", type=int, default=8)
+    parser.add_argument("--str-len", type=int, default=12)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default="bench_results.json", help="JSON file runs are appended to")
+    args = parser.parse_args()
+    run = run_benchmarks(args.entries, args.cases, args.repeat, args.curve_len, args.str_len,
+                         args.fanout, args.seed)
+    append_results(args.results, run)
+    print(f"Results appended to {args.results}")
+
+if __name__ == "__main__":
+    main()
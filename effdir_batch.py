@@ -0,0 +1,258 @@
+# effdir_batch.py
+# Batch job runner behind "main.py batch jobs.json".
+# jobs.json is a list of jobs (or {"jobs": [...]}); each job is either
+#   {"argv": ["isolate", "in.effdir", "out.effdir", "--index", "5", "--name", "x"]}
+# or the same command as an object, positionals by name, options by long name:
+#   {"cmd": "isolate", "input": "in.effdir", "output": "out.effdir", "index": 5, "name": "x"}
+#   {"cmd": "query", "input": "in.effdir", "section": 13, "fields": ["str"],
+#    "result_file": "names.json"}
+# Relative paths are taken relative to the jobs file.  Jobs on the same input
+# run in one worker and share one parse; different inputs are spread over a
+# process pool (one worker per CPU by default).  A job that reads or writes a
+# file an earlier job writes (or writes a file an earlier job reads) runs
+# after it: in the same worker when both are on one input, else in a later
+# wave, so e.g. isolate jobs followed by a merge of their outputs work; a
+# job's write also drops its group's parse of that file.  Every job is timed
+# and runs in its own try/except, so one failure does not stop the others.
+# The report lists the jobs in input order with "ok", "seconds" and the
+# command's result (or "result_file", where it was written) or "error".
+# Usage:
+#   python main.py batch jobs.json --jobs 8 --report report.json
+
+import io
+import json
+import os
+import pickle
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr
+
+from effdir_cli import build_parser, json_default, resolve_paths, run_command
+from read_effdir import read_effdir
+
+# what fut.result() raises when a group's worker died or its report could not
+# be sent back; every job error is caught and reported inside _run_group
+_POOL_ERRORS = (BrokenProcessPool, pickle.PicklingError, TypeError, MemoryError, OSError)
+
+# positional arguments of each batchable command, in CLI order
+_POSITIONALS = {
+    "read": ("input",),
+    "query": ("input",),
+    "write": ("input", "output"),
+    "export": ("input", "output"),
+    "patch": ("input",),
+    "merge": ("output", "inputs"),
+    "dedupe": ("input", "output"),
+    "find": ("input", "pattern"),
+    "isolate": ("input", "output"),
+    "isolate-many": ("input", "select"),
+}
+
+def job_argv(job):
+    """Command line for one job object."""
+    if "argv" in job:
+        return [str(a) for a in job["argv"]]
+    cmd = job.get("cmd")
+    if cmd not in _POSITIONALS:
+        raise ValueError(f"unsupported batch command {cmd!r} (expected one of {sorted(_POSITIONALS)})")
+    argv = [cmd]
+    for key in _POSITIONALS[cmd]:
+        if key not in job:
+            raise ValueError(f"{cmd} job needs {key!r}")
+        v = job[key]
+        argv += [str(x) for x in v] if isinstance(v, list) else [str(v)]
+    for key, v in job.items():
+        if key in ("cmd", "result_file") or key in _POSITIONALS[cmd] or v is None or v is False:
+            continue
+        opt = "--" + key.replace("_", "-")
+        if v is True:
+            argv.append(opt)
+        elif isinstance(v, list):
+            argv += [opt] + [str(x) for x in v]
+        else:
+            argv += [opt, str(v)]
+    return argv
+
+def _parse_job(parser, job, base_dir):
+    err = io.StringIO()
+    try:
+        with redirect_stderr(err):
+            args = parser.parse_args(job_argv(job))
+    except SystemExit:
+        raise ValueError(err.getvalue().strip().splitlines()[-1]) from None
+    if args.cmd not in _POSITIONALS:
+        raise ValueError(f"unsupported batch command {args.cmd!r}")
+    resolve_paths(args, base_dir)
+    result_file = job.get("result_file")
+    if result_file and not os.path.isabs(result_file):
+        result_file = os.path.join(base_dir, result_file)
+    return args, result_file
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def _job_files(args, result_file=None):
+    """(files the job reads, files it writes), as normalized paths."""
+    reads = list(getattr(args, "inputs", None) or [])
+    if getattr(args, "input", None):
+        reads.append(args.input)
+    writes = [result_file] if result_file else []
+    if args.cmd == "patch":
+        writes.append(args.input)
+    elif args.cmd == "isolate-many":
+        writes += [spec.rpartition("=")[2] for spec in args.select]
+    elif getattr(args, "output", None):
+        writes.append(args.output)
+    return {_norm(p) for p in reads}, {_norm(p) for p in writes}
+
+def _run_group(items, disk_cache=True):
+    """Run the jobs of one input in order, sharing one parse."""
+    parsed = {}
+
+    def load(path):
+        if path not in parsed:
+            try:
+                parsed[path] = (read_effdir(path, cache=disk_cache), None)
+            except Exception as exc:
+                parsed[path] = (None, exc)
+        effdir, exc = parsed[path]
+        if exc is not None:
+            raise exc
+        return effdir
+
+    report = []
+    for i, args, result_file in items:
+        rec = {"job": i, "cmd": args.cmd, "input": getattr(args, "input", None)}
+        t0 = time.perf_counter()
+        try:
+            result = run_command(args, load=load)
+            # later jobs must see what this one wrote (patched in place,
+            # isolated / deduplicated / merged over a parsed input, ...)
+            written = _job_files(args)[1]
+            for path in [p for p in parsed if _norm(p) in written]:
+                del parsed[path]
+            if result_file:
+                with open(result_file, "w", encoding="utf-8") as f:
+                    json.dump(result, f, indent=2, ensure_ascii=False, default=json_default)
+                rec["result_file"] = result_file
+            else:
+                # round trip through JSON here so the report is always serializable
+                rec["result"] = json.loads(json.dumps(result, default=json_default))
+            rec["ok"] = True
+        except Exception as exc:
+            rec["ok"] = False
+            rec["error"] = f"{type(exc).__name__}: {exc}"
+            rec["traceback"] = traceback.format_exc()
+        rec["seconds"] = time.perf_counter() - t0
+        report.append(rec)
+    return report
+
+def _group_key(i, args):
+    # write jobs read JSON and merge jobs several effdirs: nothing to share
+    if args.cmd in ("write", "merge"):
+        return ("job", i)
+    return ("input", os.path.normcase(args.input))
+
+def _group_size(items):
+    try:
+        args = items[0][1]
+        return sum(os.path.getsize(path) for path in getattr(args, "inputs", None) or [args.input])
+    except OSError:
+        return 0
+
+def _waves(items):
+    """
+    Split (i, args, result_file) items into waves of groups: a job runs after
+    every earlier job that writes a file it reads or writes, or reads a file
+    it writes -- in the same group when both share one, else in a later wave.
+    """
+    wave_of = {}
+    files = []
+    waves = []
+    for i, args, result_file in items:
+        key = _group_key(i, args)
+        reads, writes = _job_files(args, result_file)
+        wave = 0
+        for (k_reads, k_writes, k_key, k_wave) in files:
+            if writes & (k_reads | k_writes) or reads & k_writes:
+                wave = max(wave, k_wave if k_key == key else k_wave + 1)
+        # the group runs its jobs in order, so it cannot start before its
+        # latest member's wave
+        wave = max(wave, wave_of.get(key, 0))
+        wave_of[key] = wave
+        files.append((reads, writes, key, wave))
+        while len(waves) <= wave:
+            waves.append({})
+        waves[wave].setdefault(key, []).append((i, args, result_file))
+    return waves
+
+def run_batch(jobs, base_dir=".", processes=None, disk_cache=True):
+    """
+    Run a list of job objects; returns the report dict.
+    processes: worker processes (default: CPU count; 1 runs everything inline).
+    Jobs that depend on each other's files run in order (see _waves).
+    """
+    t0 = time.perf_counter()
+    parser = build_parser()
+    items = []
+    records = {}
+    for i, job in enumerate(jobs):
+        try:
+            args, result_file = _parse_job(parser, job, base_dir)
+        except Exception as exc:
+            records[i] = {"job": i, "ok": False, "seconds": 0.0, "error": f"{type(exc).__name__}: {exc}"}
+            continue
+        items.append((i, args, result_file))
+
+    waves = _waves(items)
+    workers = min(processes or os.cpu_count() or 1, max([1] + [len(groups) for groups in waves]))
+    pool = None
+    try:
+        for groups in waves:
+            # biggest inputs first so they do not end up last on a busy pool
+            ordered = sorted(groups.values(), key=_group_size, reverse=True)
+            if workers <= 1 or len(ordered) == 1:
+                for group in ordered:
+                    for rec in _run_group(group, disk_cache):
+                        records[rec["job"]] = rec
+                continue
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=workers)
+            futures = [(group, pool.submit(_run_group, group, disk_cache)) for group in ordered]
+            broken = False
+            for group, fut in futures:
+                try:
+                    group_report = fut.result()
+                except _POOL_ERRORS as exc:
+                    broken = broken or isinstance(exc, BrokenProcessPool)
+                    group_report = [{"job": i, "cmd": args.cmd, "input": getattr(args, "input", None), "ok": False,
+                                     "seconds": 0.0, "error": f"{type(exc).__name__}: {exc}"}
+                                    for i, args, _result_file in group]
+                for rec in group_report:
+                    records[rec["job"]] = rec
+            if broken:
+                # a dead worker breaks the whole pool; later waves get a new one
+                pool.shutdown()
+                pool = None
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    report = [records[i] for i in range(len(jobs))]
+    return {
+        "jobs": report,
+        "ok": sum(1 for r in report if r["ok"]),
+        "failed": sum(1 for r in report if not r["ok"]),
+        "workers": workers,
+        "seconds": time.perf_counter() - t0,
+    }
+
+def load_jobs(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    jobs = data.get("jobs") if isinstance(data, dict) else data
+    if not isinstance(jobs, list) or not all(isinstance(j, dict) for j in jobs):
+        raise ValueError(f"{filename}: expected a list of job objects")
+    return jobs
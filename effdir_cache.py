@@ -0,0 +1,413 @@
+# effdir_cache.py
+# Parse caches: an on-disk snapshot cache (for repeated CLI runs) and an
+# in-process LRU cache (for long-running processes, see below).
+# On disk, a pickled snapshot of read_effdir()'s result is kept per source
+# file and reused while the source is unchanged.
+# Snapshots live in one cache directory, named after the source's absolute
+# path.  Each starts with a small header (path, size, mtime_ns, SHA-1 of the
+# content) that is checked before the body is loaded: size + mtime match is
+# a hit; if only the mtime changed the content hash decides.  The directory
+# is capped in bytes and evicts least recently used snapshots first (a hit
+# bumps the snapshot's mtime).
+# Loading a snapshot unpickles it, which can run code, so on POSIX a
+# snapshot is only loaded when it is a regular file owned by the current
+# user in a directory owned by that user, neither writable by group or
+# others; anything else is ignored and the source is parsed instead.  The
+# directory is created 0700 and snapshots 0600; no snapshots are written to
+# a directory that fails the check (one RuntimeWarning per directory).
+# The cache is opt-in per call: read_effdir(..., cache=True) or
+# cached_read_effdir; read_effdir's default is a plain parse.  The CLI turns
+# it on unless --no-cache is given.
+# Usage:
+#   from effdir_cache import cached_read_effdir
+#   eff = cached_read_effdir("some_effect.eff")      # parses once, then loads
+#   python main.py isolate in.eff out.eff --index 5 --name x --no-cache   # bypass from the CLI
+
+import gc
+import hashlib
+import os
+import pickle
+import stat
+import threading
+import warnings
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from copy import deepcopy
+
+from effdir_index import file_hash
+from read_effdir import parse_effdir, read_effdir
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".effcache"
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+
+def default_cache_dir():
+    """$EFFDIR_CACHE_DIR, else a per-user cache directory."""
+    path = os.environ.get("EFFDIR_CACHE_DIR")
+    if path:
+        return path
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") \
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "EffDirEditor")
+
+def snapshot_path(filename, cache_dir=None):
+    key = hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or default_cache_dir(), key + CACHE_SUFFIX)
+
+def _private(st):
+    # owned by this user and writable by nobody else
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+_warned_dirs = set()
+
+def _trusted_dir(cache_dir):
+    """False (warning once per directory) if snapshots must not be written to `cache_dir`."""
+    if not hasattr(os, "getuid"):
+        return True
+    if _private(os.stat(cache_dir)):
+        return True
+    if cache_dir not in _warned_dirs:
+        _warned_dirs.add(cache_dir)
+        warnings.warn(f"{cache_dir}: cache directory writable by another user, not storing snapshots",
+                      RuntimeWarning, stacklevel=3)
+    return False
+
+def _open_snapshot(path):
+    """Open the snapshot at `path` for reading, or raise OSError if it is not trusted."""
+    if not hasattr(os, "getuid"):
+        # Windows: the cache lives in the per-user profile, no POSIX owners
+        return open(path, "rb")
+    fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    try:
+        st = os.fstat(fd)
+        if not (stat.S_ISREG(st.st_mode) and _private(st) and _private(os.stat(os.path.dirname(path)))):
+            raise PermissionError(f"{path}: snapshot or cache directory writable by another user")
+        return os.fdopen(fd, "rb")
+    except BaseException:
+        os.close(fd)
+        raise
+
+def _load(path, filename, st):
+    """Return (header, effdir) for a valid snapshot of `filename`, else None."""
+    try:
+        with _open_snapshot(path) as f:
+            header = pickle.load(f)
+            if (not isinstance(header, dict) or header.get("version") != CACHE_VERSION
+                    or header.get("path") != os.path.abspath(filename)
+                    or header.get("size") != st.st_size):
+                return None
+            if header.get("mtime_ns") != st.st_mtime_ns:
+                # touched or copied but possibly identical: confirm with the hash
+                if header.get("hash") != file_hash(filename):
+                    return None
+                header["mtime_ns"] = st.st_mtime_ns
+                header["touched"] = True
+            # unpickling creates millions of objects; cyclic GC passes would
+            # dominate the load time and cannot find garbage here
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                effdir = pickle.load(f)
+            finally:
+                if enabled:
+                    gc.enable()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        return None
+    return header, effdir
+
+def store(filename, effdir, buf, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Snapshot `effdir` (parsed from `buf`, the content of `filename`), unless
+    the cache directory is not private to this user (see _trusted_dir).
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    if not _trusted_dir(cache_dir):
+        return
+    st = os.stat(filename)
+    header = {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(filename),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "hash": hashlib.sha1(buf).hexdigest(),
+    }
+    _write(snapshot_path(filename, cache_dir), header, effdir)
+    evict(cache_dir, max_bytes)
+
+def _write(path, header, effdir):
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(effdir, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def cached_read_effdir(filename, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    read_effdir(filename) through the snapshot cache.  Cache write failures
+    (read-only or full disk) are ignored; the parsed result is still returned.
+    """
+    st = os.stat(filename)
+    path = snapshot_path(filename, cache_dir)
+    hit = _load(path, filename, st)
+    if hit is not None:
+        header, effdir = hit
+        try:
+            if header.pop("touched", False):
+                _write(path, header, effdir)
+            else:
+                os.utime(path)  # LRU stamp
+        except OSError:
+            pass
+        return effdir
+
+    with open(filename, "rb") as f:
+        buf = f.read()
+    effdir = parse_effdir(buf)
+    try:
+        store(filename, effdir, buf, cache_dir, max_bytes)
+    except (OSError, pickle.PicklingError):
+        pass
+    return effdir
+
+def _snapshots(cache_dir):
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return []
+    out = []
+    for name in names:
+        if name.endswith(CACHE_SUFFIX):
+            path = os.path.join(cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((st.st_mtime_ns, st.st_size, path))
+    return out
+
+def evict(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Delete least recently used snapshots until the cache fits max_bytes."""
+    snaps = sorted(_snapshots(cache_dir or default_cache_dir()))
+    total = sum(size for _, size, _ in snaps)
+    for _, size, path in snaps:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def invalidate(filename, cache_dir=None):
+    """Drop the snapshot of `filename`; returns True if one existed."""
+    try:
+        os.remove(snapshot_path(filename, cache_dir))
+    except FileNotFoundError:
+        return False
+    return True
+
+def clear_cache(cache_dir=None):
+    """Drop every snapshot in the cache directory; returns how many."""
+    n = 0
+    for _, _, path in _snapshots(cache_dir or default_cache_dir()):
+        try:
+            os.remove(path)
+            n += 1
+        except OSError:
+            pass
+    return n
+
+# ---------------------------
+# In-process cache
+# ---------------------------
+# For long-running processes: parsed effdirs stay in memory, keyed by
+# absolute path and checked against the file's identity (device, inode,
+# size, mtime) on every lookup.  The budget is in approximate bytes
+# (file size x MEMORY_EXPANSION, the measured ratio of a plain parse) and
+# least recently used directories are evicted first.  Callers get read-only
+# views by default: containers are wrapped lazily on access, mutation raises
+# TypeError and .copy() returns a mutable shallow copy of just that level
+# (copy-on-write: copy the containers you change, share the rest).
+# Usage:
+#   from effdir_cache import get_effdir
+#   eff = get_effdir("some_effect.eff")        # read-only view, parsed once
+#   neff = isolate_eff(eff, 5, "farmhorses")   # safe, cached state untouched
+
+MEMORY_EXPANSION = 15
+DEFAULT_MEMORY_BYTES = 1 << 30  # 1 GiB
+
+class FrozenDict(Mapping):
+    """Read-only view of a dict; nested containers are returned as views."""
+    __slots__ = ("_d",)
+
+    def __init__(self, d):
+        self._d = d
+
+    def __getitem__(self, key):
+        return freeze(self._d[key])
+
+    def __contains__(self, key):
+        return key in self._d
+
+    def __iter__(self):
+        return iter(self._d)
+
+    def __len__(self):
+        return len(self._d)
+
+    def __repr__(self):
+        return f"FrozenDict({self._d!r})"
+
+    def copy(self):
+        """Mutable shallow copy; its nested containers stay read-only views."""
+        return {k: freeze(v) for k, v in self._d.items()}
+
+    def thaw(self):
+        """Fully mutable deep copy."""
+        return deepcopy(self._d)
+
+class FrozenList(Sequence):
+    """Read-only view of a list; nested containers are returned as views."""
+    __slots__ = ("_l",)
+
+    def __init__(self, lst):
+        self._l = lst
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return FrozenList(self._l[i])
+        return freeze(self._l[i])
+
+    def __len__(self):
+        return len(self._l)
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenList):
+            return self._l == other._l
+        if isinstance(other, (list, tuple)):
+            return self._l == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FrozenList({self._l!r})"
+
+    def copy(self):
+        """Mutable shallow copy; its nested containers stay read-only views."""
+        return [freeze(v) for v in self._l]
+
+    def thaw(self):
+        """Fully mutable deep copy."""
+        return deepcopy(self._l)
+
+def freeze(value):
+    """Wrap dicts and lists in read-only views; other values pass through."""
+    if isinstance(value, dict):
+        return FrozenDict(value)
+    if isinstance(value, list):
+        return FrozenList(value)
+    return value
+
+def unfreeze(value):
+    """
+    Plain containers for serialization: views are replaced by the cached
+    objects they wrap (no copy, so the result must not be mutated).
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value._d if isinstance(value, FrozenDict) else value._l
+    if isinstance(value, dict):
+        return {k: unfreeze(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [unfreeze(v) for v in value]
+    return value
+
+class MemoryCache:
+    """Thread-safe LRU cache of parsed effdirs bounded by approximate bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES, disk_cache=False):
+        self.max_bytes = max_bytes
+        self.disk_cache = disk_cache   # passed to read_effdir(cache=...) on a miss
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()    # abspath -> (identity, effdir, cost)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, filename):
+        return os.path.abspath(filename) in self._items
+
+    def _lookup(self, path, ident):
+        with self._lock:
+            item = self._items.get(path)
+            if item is not None and item[0] == ident:
+                self._items.move_to_end(path)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            return None
+
+    def _insert(self, path, ident, effdir, cost):
+        with self._lock:
+            old = self._items.pop(path, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            if cost > self.max_bytes:
+                return
+            self._items[path] = (ident, effdir, cost)
+            self.nbytes += cost
+            while self.nbytes > self.max_bytes:
+                _path, (_ident, _eff, c) = self._items.popitem(last=False)
+                self.nbytes -= c
+
+    def get(self, filename, copy=False):
+        """
+        Parsed effdir for `filename`, reparsed only if the file changed.
+        Returns a read-only view, or a private deep copy with copy=True.
+        """
+        st = os.stat(filename)
+        path = os.path.abspath(filename)
+        ident = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        effdir = self._lookup(path, ident)
+        if effdir is None:
+            effdir = read_effdir(filename, cache=self.disk_cache)
+            self._insert(path, ident, effdir, st.st_size * MEMORY_EXPANSION)
+        return deepcopy(effdir) if copy else freeze(effdir)
+
+    def invalidate(self, filename):
+        """Drop `filename`; returns True if it was cached."""
+        with self._lock:
+            item = self._items.pop(os.path.abspath(filename), None)
+            if item is None:
+                return False
+            self.nbytes -= item[2]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {"entries": len(self._items), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+_memory_cache = MemoryCache()
+
+def get_effdir(filename, copy=False):
+    """MemoryCache.get on the process-wide cache."""
+    return _memory_cache.get(filename, copy)
+
+def memory_cache():
+    """The process-wide MemoryCache (e.g. to change max_bytes or clear it)."""
+    return _memory_cache
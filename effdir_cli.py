@@ -0,0 +1,238 @@
+# effdir_cli.py
+# The commands behind main.py, importable without the entry point: the
+# argument parser, path resolution and run_command, shared by main.py, the
+# batch runner (effdir_batch) and the resident server (effdir_server).
+# Usage:
+#   args = build_parser().parse_args(["query", "big.eff", "--section", "13"])
+#   resolve_paths(args, os.getcwd())
+#   result = run_command(args)
+
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+
+from read_effdir import read_effdir, iter_entries
+from write_effdir import write_effdir
+from isolate_eff import isolate_eff, isolate_many
+from effdir_json import FORMATS, decode_bytes, dump_effdir, export_json, json_default
+
+def format_json(obj):
+    try:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=json_default)
+    except Exception:
+        # fallback: repr
+        return repr(obj)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="EffDirEditor (minimal)")
+    parser.add_argument("--server", default=os.environ.get("EFFDIR_SERVER"),
+                        help="Forward the command to a running 'serve' instance at this URL "
+                             "(default: $EFFDIR_SERVER)")
+    parser.add_argument("--server-token", default=os.environ.get("EFFDIR_SERVER_TOKEN"),
+                        help="Token printed by 'serve' at startup (default: $EFFDIR_SERVER_TOKEN)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("read", help="Read an EffDir file")
+    r.add_argument("input", help="Input .effdir file")
+    r.add_argument("--format", choices=FORMATS, default="pretty",
+                   help="pretty (indented), compact, or ndjson (one entry per line)")
+    r.add_argument("--sections", type=int, nargs="+", choices=range(1, 16), metavar="N",
+                   help="Only these sections (1-15)")
+    r.add_argument("--output", help="Write the JSON here instead of stdout")
+
+    q = sub.add_parser("query", help="Print the entries of one section")
+    q.add_argument("input", help="Input .effdir file")
+    q.add_argument("--section", type=int, required=True, help="Section number (1-15)")
+    q.add_argument("--index", type=int, help="Only this entry (0-based)")
+    q.add_argument("--fields", nargs="+", help="Only these entry fields")
+
+    w = sub.add_parser("write", help="Write effdir from a JSON file (minimal)")
+    w.add_argument("input", help="Input JSON file")
+    w.add_argument("output", help="Output .effdir file")
+
+    ex = sub.add_parser("export", help="Export sections as columnar tables into one .npz (needs numpy)")
+    ex.add_argument("input", help="Input .effdir file")
+    ex.add_argument("output", help="Output .npz file")
+    ex.add_argument("--sections", type=int, nargs="+", choices=range(1, 16), metavar="N",
+                    help="Only these sections (1-15)")
+
+    pa = sub.add_parser("patch", help="Overwrite fixed-width entry fields in place")
+    pa.add_argument("input", help=".effdir file to patch")
+    pa.add_argument("--set", dest="patches", action="append", default=[], metavar="SECTION:INDEX:FIELD=VALUE",
+                    help="One patch (0-based entry index, dotted field path, e.g. 12:0:prim_indx.1.indx_key=4); "
+                         "repeatable")
+    pa.add_argument("--patches-file", help="JSON list of {section, index, field, value} patches")
+    pa.add_argument("--no-mmap", action="store_true", help="Use seek + write instead of a memory map")
+
+    mg = sub.add_parser("merge", help="Concatenate several effdirs into one")
+    mg.add_argument("output", help="Output .effdir file")
+    mg.add_argument("inputs", nargs="+", help="Input .effdir files, in order")
+    mg.add_argument("--on-collision", choices=("error", "rename", "keep"), default="error",
+                    help="Effect name already taken by an earlier input: fail, add a _N suffix, or keep it")
+
+    fd = sub.add_parser("find", help="Look up effects by Section 13 name")
+    fd.add_argument("input", help="Input .effdir file")
+    fd.add_argument("pattern", help="Name, prefix or glob pattern (case-sensitive)")
+    fd.add_argument("--mode", choices=("exact", "prefix", "glob"), default="glob",
+                    help="How to match the pattern (default: glob; no wildcards means exact)")
+
+    dd = sub.add_parser("dedupe", help="Collapse byte-identical entries and repoint their references")
+    dd.add_argument("input", help="Input .effdir file")
+    dd.add_argument("output", help="Output .effdir file (may be the input)")
+    dd.add_argument("--sections", type=int, nargs="+", default=[1, 2, 6, 8],
+                    help="Sections to deduplicate (default: 1 2 6 8)")
+
+    iso = sub.add_parser("isolate", help="Isolate an effect (minimal)")
+    iso.add_argument("input", help="Input .effdir file")
+    iso.add_argument("output", help="Output .effdir file")
+    which = iso.add_mutually_exclusive_group(required=True)
+    which.add_argument("--index", type=int, help="1-based Section 13 index")
+    which.add_argument("--name-match", help="Exact name or glob pattern that must match exactly one effect")
+    which.add_argument("--effects", nargs="+", metavar="INDEX_OR_NAME",
+                       help="Isolate several effects (1-based indices or sec13 names) into the one output, "
+                            "sharing their common entries")
+    iso.add_argument("--name", type=str, help="New effect name (required with --index / --name-match)")
+    iso.add_argument("--no-cache", action="store_true", help="Do not use the on-disk parse cache")
+
+    im = sub.add_parser("isolate-many", help="Isolate several effects from one parse")
+    im.add_argument("input", help="Input .effdir file")
+    im.add_argument("select", nargs="+", help="INDEX_OR_NAME=OUTPUT.effdir (1-based index or sec13 name)")
+    im.add_argument("--jobs", type=int, default=1, help="Worker processes for serialization")
+    im.add_argument("--no-cache", action="store_true", help="Do not use the on-disk parse cache")
+
+    b = sub.add_parser("batch", help="Run a JSON list of jobs over a worker pool")
+    b.add_argument("input", help="Jobs file (see effdir_batch)")
+    b.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    b.add_argument("--report", help="Write the report here instead of printing it")
+    b.add_argument("--no-cache", action="store_true", help="Do not use the on-disk parse cache")
+
+    srv = sub.add_parser("serve", help="Run a resident server that keeps parsed effdirs in memory")
+    srv.add_argument("--host", default="127.0.0.1", help="Interface to listen on (localhost only by default)")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--max-mb", type=int, default=1024, help="Memory budget for parsed effdirs")
+    return parser
+
+def parse_selections(specs):
+    selections = []
+    for spec in specs:
+        sel, sep, out = spec.rpartition("=")
+        if not sep or not sel or not out:
+            raise ValueError(f"bad selection {spec!r}, expected INDEX_OR_NAME=OUTPUT")
+        selections.append((int(sel) if sel.isdigit() else sel, out))
+    return selections
+
+def resolve_paths(args, cwd):
+    """Make the file arguments of a parsed command absolute relative to cwd."""
+    absolute = lambda path: path if os.path.isabs(path) else os.path.join(cwd, path)
+    for attr in ("input", "output", "patches_file"):
+        if getattr(args, attr, None):
+            setattr(args, attr, absolute(getattr(args, attr)))
+    if getattr(args, "inputs", None):
+        args.inputs = [absolute(path) for path in args.inputs]
+    if getattr(args, "select", None):
+        args.select = [f"{sel}={absolute(out)}" for sel, out in
+                       (spec.rpartition("=")[::2] for spec in args.select)]
+
+def query_entries(entries, index=None, fields=None):
+    """[{"index": i, "entry": e}] for (i, e) pairs, optionally filtered."""
+    out = []
+    for i, e in entries:
+        if index is not None and i != index:
+            continue
+        if fields:
+            e = {k: e[k] for k in fields if k in e}
+        out.append({"index": i, "entry": e})
+    return out
+
+def write_read(args, load=None):
+    """
+    Stream the read command's JSON to args.output or stdout.  Without `load`
+    the file is walked straight from disk in constant memory; otherwise the
+    effdir returned by load(path) is written.
+    """
+    with (open(args.output, "w", encoding="utf-8") if args.output else nullcontext(sys.stdout)) as out:
+        if load is None:
+            export_json(args.input, out, args.sections, args.format)
+        else:
+            dump_effdir(load(args.input), out, args.sections, args.format)
+
+def run_command(args, load=None):
+    """
+    Execute one parsed command and return the object to print.
+    load: path -> effdir function used instead of read_effdir (the server
+          passes its in-memory cache).
+    """
+    if args.cmd == "query" and load is None:
+        # stream just the requested section
+        entries = ((i, e) for _nr, i, e in iter_entries(args.input, (args.section,)))
+        return query_entries(entries, args.index, args.fields)
+
+    # merge and dedupe read with spans by default, so unchanged entries are
+    # copied as bytes
+    if args.cmd == "merge":
+        from effdir_merge import merge_files
+        return merge_files(args.inputs, args.output, args.on_collision, load=load)
+
+    if args.cmd == "dedupe":
+        from effdir_dedupe import dedupe_file
+        return dedupe_file(args.input, args.output, args.sections, load=load)
+
+    if load is None:
+        load = lambda path: read_effdir(path, cache=not getattr(args, "no_cache", False))
+
+    if args.cmd == "read":
+        info = load(args.input)
+        if args.sections:
+            return {"sec": {nr: info["sec"][nr] for nr in args.sections}}
+        # remove raw bytes from printing to keep logs small
+        return {k: v for k, v in info.items() if k != "_raw_bytes"}
+
+    if args.cmd == "query":
+        entries = enumerate(load(args.input)["sec"][args.section].get("entry", []))
+        return query_entries(entries, args.index, args.fields)
+
+    if args.cmd == "write":
+        with open(args.input, "r", encoding="utf-8") as jf:
+            data = json.load(jf, object_hook=decode_bytes)
+        return write_effdir(data, args.output)
+
+    if args.cmd == "export":
+        from effdir_export import export_columnar
+        return export_columnar(args.input, args.output, args.sections)
+
+    if args.cmd == "patch":
+        from effdir_patch import parse_patch, patch_effdir
+        patches = [parse_patch(spec) for spec in args.patches]
+        if args.patches_file:
+            with open(args.patches_file, "r", encoding="utf-8") as pf:
+                patches += json.load(pf)
+        if not patches:
+            raise ValueError("no patches given (use --set or --patches-file)")
+        return patch_effdir(args.input, patches, use_mmap=not args.no_mmap)
+
+    if args.cmd == "find":
+        from effdir_names import find_effects
+        return find_effects(args.input, args.pattern, args.mode)
+
+    if args.cmd == "isolate":
+        if args.effects:
+            if args.name is not None:
+                raise ValueError("--name cannot be combined with --effects (the effects keep their names)")
+            selectors = [int(sel) if sel.isdigit() else sel for sel in args.effects]
+            return write_effdir(isolate_eff(load(args.input), selectors, None), args.output)
+        if args.name is None:
+            raise ValueError("--name is required with --index / --name-match")
+        index = args.index
+        if args.name_match is not None:
+            from effdir_names import match_one
+            index = match_one(args.input, args.name_match)
+        ne = isolate_eff(load(args.input), index, args.name)
+        return write_effdir(ne, args.output)
+
+    if args.cmd == "isolate-many":
+        selections = parse_selections(args.select)
+        return isolate_many(load(args.input), selections, processes=args.jobs)
+
+    raise ValueError(f"unknown command {args.cmd!r}")
@@ -0,0 +1,106 @@
+# effdir_columnar.py
+# Optional NumPy backend for the fixed-width record sections (5, 7, 9, 10).
+# Each section is mapped straight onto a little-endian structured array with
+# np.frombuffer, so decoding costs O(1) Python work per section and the
+# records can be queried vectorized.  The dtypes are built from the section
+# layouts in effdir_schema.  The ubit40/ubit48 fields and the raw
+# Section 7 bytes are exposed as uint8 byte subfields; use wide_uint() to
+# turn them into integers.
+# Usage:
+#   eff = read_effdir("some_effect.eff", columnar=True)
+#   keys = eff["sec"][9]["entry"]["sound_resource_key"]
+
+import struct
+
+from effdir_schema import LAYOUTS, Raw, fixed_size
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("columnar mode requires numpy (pip install numpy)")
+
+RECORD_SECTIONS = (5, 7, 9, 10)
+
+# struct code of a scalar layout field -> little-endian dtype
+_DTYPE_CODES = {"B": "u1", "b": "i1", "H": "<u2", "I": "<u4", "f": "<f4"}
+
+def _dtype(items):
+    """Structured dtype of a fixed-size layout (effdir_schema.LAYOUTS)."""
+    fields = []
+    for item in items:
+        if isinstance(item, Raw):
+            fields.append((item.name, "u1", (item.size,)))
+        elif item.kind == "uint":
+            fields.append((item.name, "u1", (struct.calcsize(item.code),)))
+        elif item.kind == "list":
+            fields.append((item.name, "<u4", (item.width,)))
+        else:
+            fields.append((item.name, _DTYPE_CODES[item.code]))
+    dtype = np.dtype(fields)
+    if dtype.itemsize != fixed_size(items):
+        raise ValueError(f"layout does not map onto a {fixed_size(items)}-byte record")
+    return dtype
+
+def _dtypes():
+    return {nr: _dtype(LAYOUTS[nr]) for nr in RECORD_SECTIONS}
+
+# field names of a record section's dtype -> {field: kind}, kind "raw" for
+# raw bytes, else the layout Field's kind ("value", "uint" or "list")
+_FIELD_KINDS = {
+    tuple(item.name for item in LAYOUTS[nr]):
+        {item.name: "raw" if isinstance(item, Raw) else item.kind for item in LAYOUTS[nr]}
+    for nr in RECORD_SECTIONS
+}
+
+RECORD_DTYPES = _dtypes() if np is not None else {}
+
+def read_records(buf, pos, section, n):
+    """
+    Map n fixed-width `section` records starting at `pos` onto a structured
+    array (a view into `buf`, no copy).  Returns (array, new_pos).
+    """
+    _require_numpy()
+    dtype = RECORD_DTYPES[section]
+    end = pos + n * dtype.itemsize
+    if end > len(buf):
+        raise EOFError(f"Unexpected EOF while reading {n} section {section} records at offset {pos}")
+    return np.frombuffer(buf, dtype=dtype, count=n, offset=pos), end
+
+def wide_uint(field):
+    """Little-endian uint8 byte subfield (e.g. sec5 u3b, sec9 u1) -> uint64 column."""
+    _require_numpy()
+    field = np.asarray(field, dtype=np.uint64)
+    shifts = np.arange(field.shape[-1], dtype=np.uint64) * np.uint64(8)
+    return np.bitwise_or.reduce(field << shifts, axis=-1)
+
+def records_to_dicts(records):
+    """
+    Expand a structured array (or a list holding its rows, e.g. from
+    isolate_eff or merge_effdirs) back into the per-entry dicts read_effdir
+    builds.  Items that are not structured rows are kept as they are.
+    """
+    out = []
+    for rec in records:
+        dtype = getattr(rec, "dtype", None)
+        if dtype is None:
+            out.append(rec)
+            continue
+        kinds = _FIELD_KINDS.get(dtype.names, {})
+        e = {}
+        for name in dtype.names:
+            v = rec[name]
+            kind = kinds.get(name)
+            if kind == "raw":
+                e[name] = v.tobytes()
+            elif kind == "list":
+                e[name] = v.tolist()
+            elif getattr(v, "ndim", 0):
+                e[name] = int.from_bytes(v.tobytes(), "little")
+            else:
+                e[name] = v.item()
+        out.append(e)
+    return out
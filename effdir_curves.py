@@ -0,0 +1,140 @@
+# effdir_curves.py
+# Ragged (CSR-style) storage for the over-time curves of Sections 1 and 2.
+# Instead of one small Python list of boxed floats per entry, every curve kind
+# of a directory lives in one contiguous float32 array plus an offsets array,
+# filled straight from the file buffer in a single pass.  Entries hold a small
+# CurveView into that storage.
+# Usage:
+#   eff = read_effdir("some_effect.eff", curves=True)
+#   rot = eff["curves"][2]["rotation_over_time"]      # RaggedCurve
+#   rot.values, rot.offsets                           # whole-directory arrays
+#   eff["sec"][2]["entry"][0]["rotation_over_time"]   # CurveView of entry 0
+
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from effdir_schema import LAYOUTS, Array
+
+def _curve_fields():
+    # the curve=True arrays of the section layouts; rows of width > 1 are
+    # tuples unless the layout asks for lists (sec2 colors are exposed per
+    # entry as red/green/blue)
+    fields = []
+    for nr, layout in sorted(LAYOUTS.items()):
+        for item in layout:
+            if isinstance(item, Array) and item.curve:
+                row_type = None if item.width == 1 else item.rows or tuple
+                fields.append((nr, item.name, item.width, row_type))
+    return tuple(fields)
+
+# (section, field, floats per rep, row type)
+CURVE_FIELDS = _curve_fields()
+
+_U32 = struct.Struct("<I")
+_SWAP = sys.byteorder != "little"
+
+class RaggedCurve:
+    """All reps of one curve kind: float32 `values` + per-entry `offsets` (in floats)."""
+    __slots__ = ("name", "width", "row_type", "values", "offsets")
+
+    def __init__(self, name, width=1, row_type=None):
+        self.name = name
+        self.width = width
+        self.row_type = row_type
+        self.values = array("f")
+        self.offsets = array("I", [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def extend(self, buf, pos, n):
+        """Append one entry of n reps read from buf[pos:]; returns (view, new_pos)."""
+        end = pos + 4 * self.width * n
+        if n:
+            if end > len(buf):
+                raise EOFError(f"Unexpected EOF while reading {self.name} at offset {pos}")
+            if _SWAP:
+                chunk = array("f", bytes(buf[pos:end]))
+                chunk.byteswap()
+                self.values.extend(chunk)
+            else:
+                self.values.frombytes(buf[pos:end])
+        self.offsets.append(len(self.values))
+        return CurveView(self, len(self.offsets) - 2), end
+
+    def read(self, buf, pos):
+        """Read a uint32 rep count and its reps; returns (n, view, new_pos)."""
+        n = _U32.unpack_from(buf, pos)[0]
+        view, pos = self.extend(buf, pos + 4, n)
+        return n, view, pos
+
+    def view(self, i, component=None):
+        return CurveView(self, i, component)
+
+class CurveView(Sequence):
+    """
+    Read-only view of entry i of a RaggedCurve.  Items are floats for
+    single-float curves, rows (tuple/list of `width` floats) otherwise, or a
+    single component of each row when `component` is given (sec2 red/green/blue).
+    """
+    __slots__ = ("curve", "i", "component")
+
+    def __init__(self, curve, i, component=None):
+        self.curve = curve
+        self.i = i
+        self.component = component
+
+    def _bounds(self):
+        offsets = self.curve.offsets
+        return offsets[self.i], offsets[self.i + 1]
+
+    def __len__(self):
+        start, end = self._bounds()
+        return (end - start) // self.curve.width
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self)))]
+        n = len(self)
+        if k < 0:
+            k += n
+        if k < 0 or k >= n:
+            raise IndexError("curve index out of range")
+        curve = self.curve
+        start = self._bounds()[0] + k * curve.width
+        if curve.width == 1:
+            return curve.values[start]
+        if self.component is not None:
+            return curve.values[start + self.component]
+        return curve.row_type(curve.values[start:start + curve.width])
+
+    def __eq__(self, other):
+        if isinstance(other, (CurveView, list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"CurveView({self.curve.name}[{self.i}], {self.tolist()!r})"
+
+    def tolist(self):
+        start, end = self._bounds()
+        curve = self.curve
+        if curve.width == 1:
+            return curve.values[start:end].tolist()
+        if self.component is not None:
+            return curve.values[start + self.component:end:curve.width].tolist()
+        return [self[k] for k in range(len(self))]
+
+    def memoryview(self):
+        """Zero-copy float32 view of this entry's raw values."""
+        start, end = self._bounds()
+        return memoryview(self.curve.values)[start:end]
+
+def new_curve_store():
+    """Empty {section: {field: RaggedCurve}} store for one directory."""
+    store = {sec_nr: {} for sec_nr, _field, _width, _row_type in CURVE_FIELDS}
+    for sec_nr, field, width, row_type in CURVE_FIELDS:
+        store[sec_nr][field] = RaggedCurve(f"sec{sec_nr}.{field}", width, row_type)
+    return store
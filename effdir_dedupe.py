@@ -0,0 +1,117 @@
+# effdir_dedupe.py
+# Collapse byte-identical entries (behind "main.py dedupe").
+# Every entry of the deduplicated sections (Sections 1, 2, 6 and 8 by
+# default) is keyed by its encoded bytes -- the bytes write_effdir would
+# write for it: the source span of an unmodified spans=True entry, else the
+# packed fields -- in a dict from bytes to the index of the first copy.
+# Later copies are dropped, the survivors keep their relative order, and
+# every Section 12 prim_indx.indx_key into a deduplicated section is
+# rewritten through the old -> new index table.  One pass over the entries
+# and one over the references.
+# Only sections referenced through prim_indx alone can be deduplicated
+# (effdir_refs.INDX_FLAG_SECTIONS); Sections 12 and 13 also carry
+# sec_indx / sec13 keys and are left alone.  Out-of-range keys are kept.
+# Usage:
+#   python main.py dedupe merged.effdir merged_small.effdir --sections 1 2 6 8
+#   deduped, report = dedupe_effdir(read_effdir("merged.effdir", spans=True))
+
+import os
+
+from effdir_refs import INDX_FLAG_SECTIONS, _entries, prim_refs
+from effdir_schema import CODECS
+from effdir_spans import entry_span
+from read_effdir import read_effdir
+from write_effdir import write_effdir
+
+DEDUPE_SECTIONS = (1, 2, 6, 8)
+
+def _encoded(e, size_of, pack):
+    span = entry_span(e)
+    if span is not None:
+        buf, start, end = span
+        return bytes(memoryview(buf)[start:end])
+    data = bytearray(size_of(e))
+    pack(data, 0, e)
+    return bytes(data)
+
+def _dedupe_section(nr, entries):
+    """(kept entries, old -> new index list, bytes removed)."""
+    size_of, pack = CODECS[nr].size, CODECS[nr].pack
+    first = {}
+    kept = []
+    remap = []
+    saved = 0
+    for i, e in enumerate(entries):
+        try:
+            key = _encoded(e, size_of, pack)
+        except (TypeError, ValueError, AttributeError) as exc:
+            raise ValueError(f"section {nr} entry {i}: {exc}") from None
+        j = first.get(key)
+        if j is None:
+            j = first[key] = len(kept)
+            kept.append(e)
+        else:
+            saved += len(key)
+        remap.append(j)
+    return kept, remap, saved
+
+def _remap_prim(e, remaps):
+    new_prim = None
+    for j, nr, key, p in prim_refs(e):
+        remap = remaps.get(nr)
+        if remap is None:
+            continue
+        if 0 <= key < len(remap) and remap[key] != key:
+            if new_prim is None:
+                new_prim = list(e["prim_indx"])
+            new_prim[j] = {**p, "indx_key": remap[key]}
+    return e if new_prim is None else {**e, "prim_indx": new_prim}
+
+def dedupe_effdir(effdir, sections=DEDUPE_SECTIONS):
+    """
+    Drop repeated entries of `sections` from a parsed effdir and point the
+    Section 12 references at the surviving copies.  The input is not
+    modified; untouched entries are shared with it.
+    Returns (deduplicated effdir, report) with report
+    {"sections": {nr: {"entries", "unique", "removed", "bytes_saved"}},
+     "removed", "bytes_saved"}.
+    """
+    allowed = set(INDX_FLAG_SECTIONS.values())
+    sections = sorted(set(sections))
+    for nr in sections:
+        if nr not in allowed:
+            raise ValueError(f"section {nr} cannot be deduplicated (expected one of {sorted(allowed)})")
+    out = dict(effdir)
+    out["sec"] = dict(effdir["sec"])
+    remaps = {}
+    report = {"sections": {}, "removed": 0, "bytes_saved": 0}
+    for nr in sections:
+        entries = _entries(effdir, nr)
+        kept, remap, saved = _dedupe_section(nr, entries)
+        removed = len(entries) - len(kept)
+        report["sections"][nr] = {"entries": len(entries), "unique": len(kept), "removed": removed,
+                                  "bytes_saved": saved}
+        report["removed"] += removed
+        report["bytes_saved"] += saved
+        if removed:
+            remaps[nr] = remap
+            out["sec"][nr] = {**effdir["sec"][nr], "n_entries": len(kept), "entry": kept}
+    if remaps:
+        s12 = effdir["sec"].get(12, {})
+        out["sec"][12] = {**s12, "entry": [_remap_prim(e, remaps) for e in _entries(effdir, 12)]}
+    return out, report
+
+def dedupe_file(filename, output, sections=DEDUPE_SECTIONS, load=None):
+    """
+    Deduplicate the .effdir `filename` into `output` (may be the same file).
+    load: path -> effdir (default: read_effdir with spans, so surviving
+          entries are copied byte for byte).
+    Returns the dedupe_effdir report plus "output", "bytes_before" and
+    "bytes_after".
+    """
+    if load is None:
+        load = lambda path: read_effdir(path, spans=True)
+    deduped, report = dedupe_effdir(load(filename), sections)
+    before = os.path.getsize(filename)
+    write_effdir(deduped, output)
+    return {"output": output, **report, "bytes_before": before, "bytes_after": os.path.getsize(output)}
@@ -0,0 +1,324 @@
+# effdir_export.py
+# Columnar export of a whole effdir into one .npz (behind "main.py export"),
+# for bulk analysis without the per-field Python decode.  Every section
+# becomes a table of typed NumPy columns, named "sec<nr>/<field>":
+#   ints     uint32 when every value fits, else int64
+#   floats   float32 when that is lossless (everything the reader decodes),
+#            else float64
+#   strings  uint32 ids into the shared string table "__strings__.offsets" /
+#            "__strings__.data" (latin1 bytes, as stored in the effdir)
+#   bytes    "<field>.offsets" + "<field>.data" (uint8)
+#   lists    "<field>.offsets" (int64, rows + 1) + the element column
+#            "<field>[]"; lists of lists and lists of dicts nest, e.g.
+#            "sec1/spiral_reps[][]" or "sec12/prim_indx[]/indx_key"
+#   dicts    one column per key, "<field>/<key>"
+# "__schema__.json" records the tables (rows, eos markers), the kind of
+# every column, the file header and the 13.5 block.  Members are stored
+# uncompressed and 64-byte aligned, so load_export() maps the arrays
+# straight from the file; np.load() reads the same archive too.
+# The file is walked one section at a time (read_effdir.walk_effdir), so
+# only the columns of the current section are held in memory.
+# Usage:
+#   python main.py export big.eff big.npz --sections 1 12 13
+#   ex = load_export("big.npz")
+#   keys = ex["sec12/prim_indx[]/indx_key"]
+#   names = ex.strings("sec13/str")
+
+import io
+import json
+import mmap
+import zipfile
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from read_effdir import map_effdir, walk_effdir
+
+EXPORT_FORMAT = "effdir-columnar"
+EXPORT_VERSION = 1
+SCHEMA_MEMBER = "__schema__.json"
+STRINGS = "__strings__"
+STRING_ENCODING = "latin1"
+ALIGNMENT = 64
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("columnar export requires numpy (pip install numpy)")
+
+def _kind(value):
+    if isinstance(value, (int, float)):
+        return "float" if isinstance(value, float) else "int"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes"
+    if isinstance(value, dict):
+        return "struct"
+    if isinstance(value, (list, tuple)):
+        return "list"
+    raise TypeError(f"cannot export value of type {type(value).__name__}")
+
+class _StringTable:
+    __slots__ = ("ids", "offsets", "data")
+
+    def __init__(self):
+        self.ids = {}
+        self.offsets = array("q", [0])
+        self.data = bytearray()
+
+    def add(self, s):
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.ids)
+            self.data += s.encode(STRING_ENCODING, "replace")
+            self.offsets.append(len(self.data))
+        return i
+
+class _Column:
+    """Values of one field over the rows of a table, built append by append."""
+    __slots__ = ("kind", "values", "offsets", "children", "rows", "strings")
+
+    def __init__(self, strings, kind=None):
+        self.kind = None
+        self.values = None     # array / bytearray for leaf kinds
+        self.offsets = None    # list and bytes kinds
+        self.children = None   # list: element column; struct: {key: column}
+        self.rows = 0          # struct kind
+        self.strings = strings
+        if kind is not None:
+            self._start(kind)
+
+    def _start(self, kind):
+        self.kind = kind
+        if kind == "int":
+            self.values = array("q")
+        elif kind == "float":
+            self.values = array("d")
+        elif kind == "str":
+            self.values = array("I")
+        elif kind == "bytes":
+            self.offsets = array("q", [0])
+            self.values = bytearray()
+        elif kind == "list":
+            self.offsets = array("q", [0])
+            self.children = _Column(self.strings)
+        else:
+            self.children = {}
+
+    def append(self, value):
+        kind = _kind(value)
+        if self.kind is None:
+            self._start(kind)
+        elif kind != self.kind:
+            if self.kind == "int" and kind == "float":
+                self.kind, self.values = "float", array("d", self.values)
+            elif not (self.kind == "float" and kind == "int"):
+                raise TypeError(f"mixed {self.kind} and {kind} values in one column")
+        if kind in ("int", "float"):
+            self.values.append(value)
+        elif kind == "str":
+            self.values.append(self.strings.add(value))
+        elif kind == "bytes":
+            self.values += value
+            self.offsets.append(len(self.values))
+        elif kind == "list":
+            child = self.children
+            for v in value:
+                child.append(v)
+            self.offsets.append(self.offsets[-1] + len(value))
+        else:
+            self._append_struct(value)
+
+    def _append_struct(self, value):
+        children = self.children
+        if not self.rows:
+            for key in value:
+                children[key] = _Column(self.strings)
+        elif len(value) != len(children) or any(key not in children for key in value):
+            raise ValueError(f"fields {sorted(value)} do not match {sorted(children)}")
+        for key, v in value.items():
+            children[key].append(v)
+        self.rows += 1
+
+    def __len__(self):
+        if self.kind in ("list", "bytes"):
+            return len(self.offsets) - 1
+        if self.kind == "struct":
+            return self.rows
+        return len(self.values) if self.values is not None else 0
+
+    def arrays(self, path, kinds):
+        """Yield (name, ndarray) for this column and its children."""
+        kinds[path] = self.kind or "empty"
+        if self.kind is None:
+            yield path, np.zeros(0, dtype="<f4")
+        elif self.kind == "int":
+            yield path, _int_array(self.values)
+        elif self.kind == "float":
+            yield path, _float_array(self.values)
+        elif self.kind == "str":
+            yield path, np.frombuffer(self.values, dtype=np.uint32).astype("<u4")
+        elif self.kind == "bytes":
+            yield path + ".offsets", _offsets_array(self.offsets)
+            yield path + ".data", np.frombuffer(bytes(self.values), dtype=np.uint8)
+        elif self.kind == "list":
+            yield path + ".offsets", _offsets_array(self.offsets)
+            yield from self.children.arrays(path + "[]", kinds)
+        else:
+            yield from self.field_arrays(path, kinds)
+
+    def field_arrays(self, path, kinds):
+        """arrays() of every field of a struct column."""
+        for key, child in self.children.items():
+            yield from child.arrays(f"{path}/{key}", kinds)
+
+def _offsets_array(offsets):
+    return np.frombuffer(offsets, dtype=np.int64).astype("<i8")
+
+def _int_array(values):
+    a = np.frombuffer(values, dtype=np.int64)
+    if not len(a) or (a.min() >= 0 and a.max() <= 0xFFFFFFFF):
+        return a.astype("<u4")
+    return a.astype("<i8")
+
+def _float_array(values):
+    a = np.frombuffer(values, dtype=np.float64)
+    f32 = a.astype("<f4")
+    if np.array_equal(f32.astype(np.float64), a, equal_nan=True):
+        return f32
+    return a.astype("<f8")
+
+def _npy_bytes(arr):
+    f = io.BytesIO()
+    np.lib.format.write_array(f, arr, allow_pickle=False)
+    data = f.getbuffer()
+    f.seek(0)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        np.lib.format.read_array_header_1_0(f)
+    else:
+        np.lib.format.read_array_header_2_0(f)
+    return data, f.tell()
+
+def _write_member(zf, name, arr):
+    data, header_len = _npy_bytes(np.ascontiguousarray(arr))
+    info = zipfile.ZipInfo(name + ".npy", date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_STORED
+    if len(data) * 1.05 <= zipfile.ZIP64_LIMIT:
+        # pad the local header's extra field so the array data starts on an
+        # ALIGNMENT boundary (zipfile adds its own zip64 field above the limit)
+        start = zf.fp.tell() + 30 + len(info.filename.encode("utf-8")) + header_len
+        pad = -(start + 4) % ALIGNMENT
+        info.extra = b"\x35\xd9" + pad.to_bytes(2, "little") + b"\0" * pad
+    zf.writestr(info, data)
+
+def export_columnar(filename, output, sections=None):
+    """
+    Write the sections of the .effdir `filename` (all when None) as columnar
+    tables into the .npz `output`.  Returns {"output", "tables", "columns",
+    "strings", "bytes"}.
+    """
+    _require_numpy()
+    strings = _StringTable()
+    schema = {"format": EXPORT_FORMAT, "version": EXPORT_VERSION,
+              "string_encoding": STRING_ENCODING, "tables": {}, "columns": {}}
+    n_arrays = 0
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        rows = None
+        for event in walk_effdir(map_effdir(filename), sections):
+            kind = event[0]
+            if kind == "entry":
+                rows.append(event[3])
+            elif kind == "section":
+                rows = _Column(strings, "struct")
+            elif kind == "end":
+                table = f"sec{event[1]}"
+                schema["tables"][table] = {"rows": len(rows), **event[2]}
+                for name, arr in rows.field_arrays(table, schema["columns"]):
+                    _write_member(zf, name, arr)
+                    n_arrays += 1
+                rows = None
+            elif kind == "init":
+                schema["init"] = event[1]
+            elif kind == "sec135":
+                schema["sec135"] = event[1]
+        _write_member(zf, STRINGS + ".offsets", _offsets_array(strings.offsets))
+        _write_member(zf, STRINGS + ".data", np.frombuffer(bytes(strings.data), dtype=np.uint8))
+        zf.writestr(SCHEMA_MEMBER, json.dumps(schema, indent=1))
+        size = zf.fp.tell()
+    return {"output": output, "tables": len(schema["tables"]), "columns": n_arrays,
+            "strings": len(strings.ids), "bytes": size}
+
+class EffdirExport:
+    """
+    Arrays of a columnar export, by name.  With mmap the arrays are
+    read-only views into one memory map of the file, so loading costs one
+    directory read however large the export is.
+    """
+
+    def __init__(self, filename, use_mmap=True):
+        _require_numpy()
+        self.arrays = {}
+        with open(filename, "rb") as f, zipfile.ZipFile(f) as zf:
+            self.schema = json.loads(zf.read(SCHEMA_MEMBER))
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap else None
+            for info in zf.infolist():
+                if not info.filename.endswith(".npy"):
+                    continue
+                name = info.filename[:-4]
+                if buf is None or info.compress_type != zipfile.ZIP_STORED:
+                    with zf.open(info) as member:
+                        self.arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                else:
+                    self.arrays[name] = _map_member(buf, f, info)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def keys(self):
+        return self.arrays.keys()
+
+    def table(self, name):
+        """{column: array} of one table, e.g. table("sec13")."""
+        prefix = name + "/"
+        return {k[len(prefix):]: v for k, v in self.arrays.items() if k.startswith(prefix)}
+
+    def ragged(self, name, row):
+        """Values of list / bytes column `name` for one row."""
+        offsets = self.arrays[name + ".offsets"]
+        values = self.arrays[name + (".data" if self.schema["columns"][name] == "bytes" else "[]")]
+        return values[offsets[row]:offsets[row + 1]]
+
+    def string(self, i):
+        offsets, data = self.arrays[STRINGS + ".offsets"], self.arrays[STRINGS + ".data"]
+        return data[offsets[i]:offsets[i + 1]].tobytes().decode(self.schema["string_encoding"])
+
+    def strings(self, name):
+        """Decode string column `name` to a list of str."""
+        return [self.string(i) for i in self.arrays[name].tolist()]
+
+def _map_member(buf, f, info):
+    # local header: 30 fixed bytes, then the file name and extra field
+    f.seek(info.header_offset + 26)
+    name_len, extra_len = int.from_bytes(f.read(2), "little"), int.from_bytes(f.read(2), "little")
+    f.seek(info.header_offset + 30 + name_len + extra_len)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    count = 1
+    for dim in shape:
+        count *= dim
+    arr = np.frombuffer(buf, dtype=dtype, count=count, offset=f.tell())
+    return arr.reshape(shape, order="F" if fortran_order else "C")
+
+def load_export(filename, use_mmap=True):
+    """Open an export written by export_columnar (see EffdirExport)."""
+    return EffdirExport(filename, use_mmap)
@@ -0,0 +1,141 @@
+# effdir_index.py
+# Byte-offset index over an effdir: where every section and every entry starts.
+# The index is saved next to the file as "<filename>.idx.json" and reused as
+# long as the file's size and mtime match (or, if only the mtime changed, its
+# content hash), so single entries can be fetched with one seek + read.
+# That shortcut is for reads only: a file replaced by one of the same size
+# with its mtime preserved (cp -p, unzip) passes it.  Writers go through
+# verified_index, which also needs the inode and ctime to match (POSIX) or
+# else the content hash, and rescans the file when neither holds.
+# effdir_names keeps its Section 13 name index in the same sidecar.
+# Usage:
+#   from effdir_index import read_entry
+#   e = read_entry("some_effect.eff", 12, 0)   # first Section 12 entry
+
+import hashlib
+import json
+import os
+
+from read_effdir import scan_effdir, decode_entry
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx.json"
+
+def index_path(filename):
+    return filename + INDEX_SUFFIX
+
+def file_hash(filename, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_identity(st):
+    """Fields of an os.stat result that change whenever the file's content is replaced."""
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "dev": st.st_dev, "ino": st.st_ino,
+            "ctime_ns": st.st_ctime_ns}
+
+def build_index(filename):
+    """Scan `filename` and return its offset index (not saved)."""
+    with open(filename, "rb") as f:
+        st = os.fstat(f.fileno())
+        buf = f.read()
+    layout = scan_effdir(buf)
+    return {
+        "version": INDEX_VERSION,
+        **file_identity(st),
+        "hash": hashlib.sha1(buf).hexdigest(),
+        "sections": layout["sections"],
+        "sec135": layout["sec135"],
+    }
+
+def _read_sidecar(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            index = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    # JSON object keys are strings; sections are addressed by number
+    index["sections"] = {int(k): v for k, v in index.get("sections", {}).items()}
+    return index
+
+def save_index(filename, index):
+    path = index_path(filename)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        # one json.dumps call runs on the C encoder; json.dump streams through
+        # the pure-Python one
+        fh.write(json.dumps(index, separators=(",", ":")))
+    os.replace(tmp, path)
+
+def load_index(filename, save=True):
+    """
+    Return the offset index for `filename`, reusing the sidecar file when it
+    still describes the file and rebuilding (and re-saving) it otherwise.
+    """
+    st = os.stat(filename)
+    index = _read_sidecar(index_path(filename))
+    if index is not None and index.get("size") == st.st_size:
+        if index.get("mtime_ns") == st.st_mtime_ns:
+            return index
+        # touched or copied but possibly identical: confirm with the hash
+        if index.get("hash") == file_hash(filename):
+            index["mtime_ns"] = st.st_mtime_ns
+            if save:
+                _try_save(filename, index)
+            return index
+
+    index = build_index(filename)
+    if save:
+        _try_save(filename, index)
+    return index
+
+def verified_index(filename, index, st):
+    """
+    `index` if it certainly describes the file whose os.stat result is `st`,
+    else a fresh build_index (not saved).  For writers: the inode and ctime
+    (which no tool can set back) must match too, or else the content hash.
+    On Windows st_ctime is the creation time, so the hash always decides.
+    """
+    identity = file_identity(st)
+    if os.name != "nt" and st.st_ino and all(index.get(k) == v for k, v in identity.items()):
+        return index
+    if index.get("size") == st.st_size and index.get("hash") and index["hash"] == file_hash(filename):
+        index.update(identity)
+        return index
+    return build_index(filename)
+
+def _try_save(filename, index):
+    # a read-only directory just means no sidecar; the index is still usable
+    try:
+        save_index(filename, index)
+    except OSError:
+        pass
+
+def entry_span(index, section, i):
+    """Return (start, end) byte offsets of entry i (0-based) of `section`."""
+    if section not in index["sections"]:
+        raise ValueError(f"unknown section {section}")
+    sec = index["sections"][section]
+    offsets = sec["entries"]
+    if i < 0 or i >= len(offsets):
+        raise IndexError(f"entry {i} out of range for section {section}")
+    end = offsets[i + 1] if i + 1 < len(offsets) else sec["entries_end"]
+    return offsets[i], end
+
+def read_entry(filename, section, i, index=None):
+    """
+    Decode only entry i (0-based) of `section` (1..15) from `filename`,
+    seeking straight to it via the offset index.
+    """
+    if index is None:
+        index = load_index(filename)
+    start, end = entry_span(index, section, i)
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    e, _pos = decode_entry(data, section, 0)
+    return e
@@ -0,0 +1,129 @@
+# effdir_json.py
+# Streaming JSON export of an effdir (behind "main.py read").  The document
+# is written section by section, one entry at a time: from a file it is
+# walked straight off a memory map (read_effdir.walk_effdir), so memory stays
+# flat however large the directory is.
+# Formats:
+#   pretty   the same text as json.dumps(read_effdir(...), indent=2)
+#   compact  the same document without whitespace
+#   ndjson   one {"section", "index", "entry"} object per line, entries only
+#            (no init / eos / sec135), for jq and line-based loaders
+# A section selection writes only those sections (and no init / sec135).
+# Bytes values (sec7 u1_raw) are written as {"__bytes__": "<base64>"};
+# json.load(f, object_hook=decode_bytes) turns them back into bytes.
+# Usage:
+#   python main.py read big.eff --format ndjson --sections 13 | jq -r .entry.str
+#   from effdir_json import export_json
+#   with open("big.json", "w", encoding="utf-8") as f:
+#       export_json("big.eff", f, fmt="compact")
+
+import base64
+import json
+
+from read_effdir import map_effdir, walk_effdir
+
+FORMATS = ("pretty", "compact", "ndjson")
+
+_SECTION_NUMBERS = tuple(range(1, 16))
+
+def json_default(obj):
+    """json.dumps default= hook: cached read-only views, records and raw bytes."""
+    from effdir_cache import FrozenDict, FrozenList
+    from effdir_records import Record
+    if isinstance(obj, FrozenDict):
+        return obj._d
+    if isinstance(obj, FrozenList):
+        return obj._l
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return {"__bytes__": base64.b64encode(bytes(obj)).decode("ascii")}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def decode_bytes(obj):
+    """json.load object_hook= inverse of the {"__bytes__": ...} encoding."""
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+def _dumps(obj, fmt, level=0):
+    if fmt == "pretty":
+        text = json.dumps(obj, indent=2, ensure_ascii=False, default=json_default)
+        # json.dumps escapes newlines inside strings, so this only re-indents
+        return text.replace("\n", "\n" + "  " * level) if level else text
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=json_default)
+
+def effdir_events(effdir, sections=None):
+    """walk_effdir-style events for an already parsed effdir."""
+    wanted = _SECTION_NUMBERS if sections is None else sorted(set(sections))
+    unknown = set(wanted) - set(_SECTION_NUMBERS)
+    if unknown:
+        raise ValueError(f"Unknown section(s): {sorted(unknown)}")
+    yield "init", effdir["init"]
+    for nr in wanted:
+        if nr == 14 and "sec135" in effdir:
+            yield "sec135", effdir["sec135"]
+        sec = effdir["sec"][nr]
+        entries = sec["entry"]
+        yield "section", nr, len(entries)
+        for i, entry in enumerate(entries):
+            yield "entry", nr, i, entry
+        yield "end", nr, {k: sec[k] for k in ("eos", "eos1", "eos2") if k in sec}
+
+def write_events(events, out, fmt="pretty", full=True):
+    """
+    Write walk_effdir events to the text stream `out` as `fmt`.
+    full: also write "init" and "sec135" (whole-directory exports).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {FORMATS})")
+    write = out.write
+    if fmt == "ndjson":
+        for event in events:
+            if event[0] == "entry":
+                _kind, nr, i, entry = event
+                write(_dumps({"section": nr, "index": i, "entry": entry}, fmt))
+                write("\n")
+        return
+
+    pretty = fmt == "pretty"
+    colon = ": " if pretty else ":"
+    nl = (lambda level: "\n" + "  " * level) if pretty else (lambda level: "")
+    init = sec135 = None
+    n_sections = n_entries = 0
+    write("{" + nl(1) + '"sec"' + colon + "{")
+    for event in events:
+        kind = event[0]
+        if kind == "entry":
+            write(("," if event[2] else "") + nl(4) + _dumps(event[3], fmt, 4))
+        elif kind == "section":
+            _kind, nr, n_entries = event
+            write(("," if n_sections else "") + nl(2) + f'"{nr}"' + colon + "{")
+            if nr != 13:
+                write(nl(3) + '"n_entries"' + colon + str(n_entries) + ",")
+            write(nl(3) + '"entry"' + colon + "[")
+            n_sections += 1
+        elif kind == "end":
+            write((nl(3) if n_entries else "") + "]")
+            for key, value in event[2].items():
+                write("," + nl(3) + f'"{key}"' + colon + _dumps(value, fmt))
+            write(nl(2) + "}")
+        elif kind == "init":
+            init = event[1]
+        elif kind == "sec135":
+            sec135 = event[1]
+    write((nl(1) if n_sections else "") + "}")
+    if full:
+        if init is not None:
+            write("," + nl(1) + '"init"' + colon + _dumps(init, fmt, 1))
+        if sec135 is not None:
+            write("," + nl(1) + '"sec135"' + colon + _dumps(sec135, fmt, 1))
+    write(nl(0) + "}\n")
+
+def dump_effdir(effdir, out, sections=None, fmt="pretty"):
+    """Write a parsed effdir (read_effdir result) to `out`."""
+    write_events(effdir_events(effdir, sections), out, fmt, full=sections is None)
+
+def export_json(filename, out, sections=None, fmt="pretty"):
+    """Stream the .effdir file `filename` to `out` without parsing it whole."""
+    write_events(walk_effdir(map_effdir(filename), sections), out, fmt, full=sections is None)
@@ -0,0 +1,138 @@
+# effdir_merge.py
+# Combine several effect directories into one (behind "main.py merge").
+# Sections 1-12, 14 and 15 are concatenated in input order.  Every index
+# key is shifted by the number of entries the earlier inputs put in front
+# of its target section, in one pass over the references:
+#   prim_indx.indx_key   + offset of the section its indx_flag points at
+#                          (effdir_refs.INDX_FLAG_SECTIONS; other flags are
+#                          redirects and keep their key)
+#   sec_indx.index_key   + offset of Section 12
+#   sec13 index_key      + offset of Section 12
+# Section 13 keeps the effect entries of every input and one closing entry
+# (the first input's); init, sec135 and the eos markers also come from the
+# first input.  Effect names are checked against a set of the names the
+# earlier inputs brought in: a repeated name is an error, renamed ("name_2",
+# "name_3", ...) or kept, see on_collision.
+# Only the Section 12 / 13 entries whose keys move are rebuilt; all other
+# entries are shared with the inputs, so inputs read with spans=True are
+# written back as plain byte copies.
+# Usage:
+#   python main.py merge all.effdir a.effdir b.effdir c.effdir --on-collision rename
+#   merged, collisions = merge_effdirs([read_effdir(p, spans=True) for p in paths])
+
+import gc
+
+from effdir_refs import _entries, prim_refs
+from read_effdir import read_effdir
+from write_effdir import write_effdir
+
+COLLISION_POLICIES = ("error", "rename", "keep")
+
+_COUNTED_SECTIONS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 15)
+
+def _remap_sec12(e, offsets):
+    new_prim = []
+    for _slot, nr, key, p in prim_refs(e):
+        if nr is not None and offsets[nr]:
+            p = {**p, "indx_key": key + offsets[nr]}
+        new_prim.append(p)
+    off12 = offsets[12]
+    new_sec = [{**s, "index_key": s.get("index_key", 0) + off12} for s in e.get("sec_indx", [])]
+    return {**e, "prim_indx": new_prim, "sec_indx": new_sec}
+
+def _unique_name(name, *taken):
+    k = 2
+    while any(f"{name}_{k}" in t for t in taken):
+        k += 1
+    return f"{name}_{k}"
+
+def merge_effdirs(effdirs, on_collision="error"):
+    """
+    Merge parsed effdirs (read_effdir results) into one new effdir.
+    on_collision: what to do with an effect name already taken by an
+                  earlier effect: "error" (ValueError), "rename" (add a
+                  "_<n>" suffix) or "keep" (allow the duplicate; name
+                  lookups then find the first one).
+    Returns (merged effdir, collisions) where collisions lists
+    {"input", "index", "name", "renamed"} with 0-based input / sec13 indices.
+    """
+    if on_collision not in COLLISION_POLICIES:
+        raise ValueError(f"unknown collision policy {on_collision!r} (expected one of {COLLISION_POLICIES})")
+    effdirs = list(effdirs)
+    if not effdirs:
+        raise ValueError("nothing to merge")
+    first = effdirs[0]
+    merged = {"init": list(first.get("init", [0, 0])), "sec": {}}
+    if "sec135" in first:
+        merged["sec135"] = first["sec135"]
+    out = {nr: [] for nr in _COUNTED_SECTIONS}
+    out13 = []
+    names = set()
+    collisions = []
+
+    for k, effdir in enumerate(effdirs):
+        # offset tables: entries the earlier inputs put in front of each section
+        offsets = {nr: len(out[nr]) for nr in _COUNTED_SECTIONS}
+        n12 = len(_entries(effdir, 12))
+        for nr in _COUNTED_SECTIONS:
+            entries = _entries(effdir, nr)
+            if nr == 12 and k:
+                entries = [_remap_sec12(e, offsets) for e in entries]
+            out[nr].extend(entries)
+
+        # effect entries only; the closing entry is added once at the end.
+        # Names are checked against the earlier inputs: repeats inside one
+        # input (and unnamed effects) are already in that file and stay as-is.
+        off12 = offsets[12]
+        added = set()
+        for i, e in enumerate(_entries(effdir, 13)[:n12]):
+            name = e.get("str", "")
+            renamed = None
+            if name and name in names:
+                if on_collision == "error":
+                    raise ValueError(f"effect name {name!r} (input {k}, sec13 entry {i}) already exists")
+                if on_collision == "rename":
+                    renamed = _unique_name(name, names, added)
+                    name = renamed
+                collisions.append({"input": k, "index": i, "name": e.get("str", ""), "renamed": renamed})
+            if renamed is not None:
+                e = {**e, "str": renamed, "str_rep": len(renamed), "index_key": e.get("index_key", 0) + off12}
+            elif off12:
+                e = {**e, "index_key": e.get("index_key", 0) + off12}
+            added.add(name)
+            out13.append(e)
+        names |= added
+
+    for nr in _COUNTED_SECTIONS:
+        sec = {"n_entries": len(out[nr]), "entry": out[nr]}
+        if "eos" in first["sec"].get(nr, {}):
+            sec["eos"] = first["sec"][nr]["eos"]
+        merged["sec"][nr] = sec
+    s13 = first["sec"].get(13, {})
+    closing = list(_entries(first, 13)[len(_entries(first, 12)):][:1]) or [{}]
+    merged["sec"][13] = {"entry": out13 + closing, "eos1": s13.get("eos1", 0), "eos2": s13.get("eos2", 0)}
+    merged["sec"] = dict(sorted(merged["sec"].items()))
+    return merged, collisions
+
+def merge_files(filenames, output, on_collision="error", load=None):
+    """
+    Merge the .effdir files `filenames` into `output`.
+    load: path -> effdir (default: read_effdir with spans, so untouched
+          entries are copied byte for byte).
+    output may be one of the inputs.
+    Returns {"output", "inputs", "effects", "collisions"}.
+    """
+    if load is None:
+        # read, not mapped: Windows cannot open a mapped file for writing
+        load = lambda path: read_effdir(path, spans=True)
+    # the inputs only pile up until the write: no cyclic GC (see effdir_cache)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        merged, collisions = merge_effdirs([load(path) for path in filenames], on_collision)
+    finally:
+        if enabled:
+            gc.enable()
+    write_effdir(merged, output)
+    return {"output": output, "inputs": len(filenames), "effects": len(merged["sec"][13]["entry"]) - 1,
+            "collisions": collisions}
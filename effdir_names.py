@@ -0,0 +1,117 @@
+# effdir_names.py
+# Name index over the Section 13 effect names (behind "main.py find" and
+# "main.py isolate --name-match").
+# Exact lookups go through a dict name -> [effect, ...]; prefix and glob
+# lookups through the names in sorted order: bisect finds the block of
+# names starting with the prefix (for a glob, the literal text before its
+# first wildcard) and only that block is matched against the pattern.
+# The names are stored in the offset index sidecar ("<filename>.idx.json",
+# see effdir_index) under "names" / "name_order", so after the first build a
+# lookup reads the sidecar and no effdir data at all.  The first build
+# decodes just the Section 13 entries, found through the offset index.
+# Effects are reported by 1-based Section 13 index, as isolate --index
+# takes them; the closing entry is not an effect.  Matching is
+# case-sensitive.
+# Usage:
+#   python main.py find big.eff "farm*"
+#   python main.py isolate big.eff farm.eff --name-match farmhorses
+#   find_effects("big.eff", "farm", mode="prefix")
+
+import re
+from bisect import bisect_left
+from fnmatch import translate
+
+from effdir_index import load_index, save_index
+from read_effdir import decode_entry
+
+MATCH_MODES = ("exact", "prefix", "glob")
+
+_WILDCARD = re.compile(r"[*?\[]")
+
+class NameIndex:
+    """Exact, prefix and glob lookup over a list of effect names."""
+
+    def __init__(self, names, order=None):
+        self.names = list(names)            # 0-based sec13 index -> name
+        if order is None:
+            order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.order = list(order)            # positions sorted by name
+        self.sorted = [self.names[i] for i in self.order]
+        self.exact = {}
+        for i, name in enumerate(self.names):
+            self.exact.setdefault(name, []).append(i)
+
+    @classmethod
+    def from_effdir(cls, effdir):
+        """Name index of a parsed effdir."""
+        n12 = len(effdir["sec"].get(12, {}).get("entry", []))
+        return cls(e.get("str", "") for e in effdir["sec"][13]["entry"][:n12])
+
+    def _block(self, prefix):
+        # positions in self.sorted of the names starting with prefix
+        lo = bisect_left(self.sorted, prefix)
+        hi = lo
+        while hi < len(self.sorted) and self.sorted[hi].startswith(prefix):
+            hi += 1
+        return lo, hi
+
+    def lookup(self, pattern, mode="glob"):
+        """0-based indices of the names matching `pattern`, in file order."""
+        if mode == "exact":
+            return list(self.exact.get(pattern, ()))
+        if mode == "prefix":
+            lo, hi = self._block(pattern)
+            return sorted(self.order[lo:hi])
+        if mode == "glob":
+            wildcard = _WILDCARD.search(pattern)
+            if wildcard is None:
+                return list(self.exact.get(pattern, ()))
+            lo, hi = self._block(pattern[:wildcard.start()])
+            match = re.compile(translate(pattern)).match
+            return sorted(self.order[k] for k in range(lo, hi) if match(self.sorted[k]))
+        raise ValueError(f"unknown match mode {mode!r} (expected one of {MATCH_MODES})")
+
+def _read_names(filename, index):
+    sec = index["sections"][13]
+    # every entry but the closing one
+    offsets = sec["entries"][:-1]
+    if not offsets:
+        return []
+    start = offsets[0]
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(sec["entries"][-1] - start)
+    return [decode_entry(data, 13, pos - start)[0].get("str", "") for pos in offsets]
+
+def load_name_index(filename, save=True):
+    """
+    NameIndex of the .effdir `filename`, from its offset index sidecar when
+    that already holds the names, else built and (with save) stored there.
+    """
+    index = load_index(filename, save=save)
+    if "names" in index and "name_order" in index:
+        return NameIndex(index["names"], index["name_order"])
+    names = NameIndex(_read_names(filename, index))
+    if save:
+        index["names"] = names.names
+        index["name_order"] = names.order
+        try:
+            save_index(filename, index)
+        except OSError:
+            pass
+    return names
+
+def find_effects(filename, pattern, mode="glob"):
+    """[{"index", "name"}] (1-based index) for the effects matching `pattern`."""
+    names = load_name_index(filename)
+    return [{"index": i + 1, "name": names.names[i]} for i in names.lookup(pattern, mode)]
+
+def match_one(filename, pattern, mode="glob"):
+    """1-based index of the single effect matching `pattern`."""
+    found = find_effects(filename, pattern, mode)
+    if len(found) != 1:
+        shown = ", ".join(f"{m['index']}:{m['name']}" for m in found[:10])
+        more = f", ... ({len(found)} total)" if len(found) > 10 else ""
+        raise ValueError(f"{pattern!r} matches {len(found)} effects, expected one"
+                         + (f": {shown}{more}" if found else ""))
+    return found[0]["index"]
@@ -0,0 +1,129 @@
+# effdir_parallel.py
+# Parallel decoding of one large effdir (read_effdir(..., processes=N)).
+# The offset index (effdir_index, reused from the sidecar when the file is
+# unchanged, else one skip-scan; a read never writes the sidecar) gives the
+# start of every entry, so the entry lists can be decoded independently:
+# every section is cut into entry ranges of roughly equal byte size, the
+# ranges go to a process pool whose workers memory-map the file once each,
+# and the decoded lists come back in file order and are stitched into the
+# same effdir parse_effdir builds.  The few scalars outside entries (header, eos markers, the 13.5
+# block) are decoded in the calling process.
+# The workers send their entries back pickled.  Unpickling them in the
+# calling process runs in C at roughly 60% of the cost of decoding and
+# overlaps with the workers still decoding later ranges, so that share is
+# the floor of the wall time (with cyclic GC off, see effdir_cache).
+# Files below PARALLEL_MIN_BYTES are parsed in-process, where the pool
+# start-up would cost more than it saves.
+# Plain parses only (no columnar / curves / records / spans: those entries
+# are tied to one process's buffers).
+# Usage:
+#   effdir = read_effdir("huge.eff", processes=8)
+#   effdir = parallel_read_effdir("huge.eff", processes=8, index=load_index("huge.eff"))
+
+import gc
+import os
+import struct
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from read_effdir import (_ENTRY_READERS, _EOS13, _HEADER, _SECTION_LAYOUT, _U16, SEC135_CODEC,
+                         map_effdir, parse_effdir)
+
+PARALLEL_MIN_BYTES = 4 << 20
+# ranges per worker: enough to even out sections of uneven cost
+_RANGES_PER_WORKER = 4
+_MIN_RANGE_BYTES = 256 << 10
+
+_buf = None
+
+def _init_worker(filename):
+    global _buf
+    _buf = map_effdir(filename)
+
+def _decode_range(task):
+    nr, start, end, n = task
+    # a private copy of the range, so raw fields are bytes, not views of
+    # this worker's mapping
+    data = bytes(_buf[start:end])
+    read_entry = _ENTRY_READERS[nr]
+    entries = []
+    append = entries.append
+    pos = 0
+    try:
+        for _ in range(n):
+            e, pos = read_entry(data, pos)
+            append(e)
+    except struct.error as exc:
+        raise EOFError(f"Unexpected EOF while decoding section {nr} entry: {exc}") from None
+    return entries
+
+def _ranges(index, target):
+    """(section, start, end, n) entry ranges of about `target` bytes, in file order."""
+    tasks = []
+    for nr in sorted(index["sections"]):
+        sec = index["sections"][nr]
+        offsets = sec["entries"] + [sec["entries_end"]]
+        i = 0
+        n = len(offsets) - 1
+        while i < n:
+            j = i + 1
+            # offsets are increasing: extend the range while it stays under target
+            while j < n and offsets[j + 1] - offsets[i] <= target:
+                j += 1
+            tasks.append((nr, offsets[i], offsets[j], j - i))
+            i = j
+    # sections in file order (13 sits between 12 and 14)
+    tasks.sort(key=lambda task: task[1])
+    return tasks
+
+def parallel_read_effdir(filename, processes=None, index=None):
+    """
+    Decode the .effdir `filename` on a pool of `processes` workers
+    (default: CPU count).  Returns what read_effdir(filename) returns.
+    index: offset index of the file (default: effdir_index.load_index,
+           without saving a sidecar).
+    """
+    processes = processes or os.cpu_count() or 1
+    size = os.path.getsize(filename)
+    if processes <= 1 or size < PARALLEL_MIN_BYTES:
+        with open(filename, "rb") as f:
+            return parse_effdir(f.read())
+    if index is None:
+        from effdir_index import load_index
+        index = load_index(filename, save=False)
+
+    target = max(_MIN_RANGE_BYTES, size // (processes * _RANGES_PER_WORKER))
+    tasks = _ranges(index, target)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(filename,)) as pool:
+            chunks = list(pool.map(_decode_range, tasks))
+    finally:
+        if enabled:
+            gc.enable()
+
+    sections = index["sections"]
+    effdir = {"sec": defaultdict(dict)}
+    buf = map_effdir(filename)
+    try:
+        effdir["init"] = list(_HEADER.unpack_from(buf, 0))
+        entries = {nr: [] for nr in sections}
+        for (nr, _start, _end, _n), chunk in zip(tasks, chunks):
+            entries[nr].extend(chunk)
+        for nr, _read_entry, has_eos in _SECTION_LAYOUT:
+            if nr == 14:
+                sec13 = {"entry": entries[13]}
+                sec13["eos1"], sec13["eos2"] = _EOS13.unpack_from(buf, sections[13]["entries_end"])
+                effdir["sec"][13] = sec13
+                effdir["sec135"], _pos = SEC135_CODEC.read(buf, index["sec135"][0])
+            sec = {"n_entries": sections[nr]["n_entries"], "entry": entries[nr]}
+            if has_eos:
+                sec["eos"] = _U16.unpack_from(buf, sections[nr]["entries_end"])[0]
+            effdir["sec"][nr] = sec
+    except struct.error as exc:
+        raise EOFError(f"Unexpected EOF while decoding effdir: {exc}") from None
+    finally:
+        buf.release()
+    return effdir
@@ -0,0 +1,142 @@
+# effdir_patch.py
+# In-place patching of fixed-width entry fields (behind "main.py patch").
+# Each patch names an entry (section, 0-based index) and a field path and
+# overwrites just that value in the file: the entry is found through the
+# offset index (effdir_index), the field's byte offset inside it from the
+# section layout (effdir_schema.locate), and the new value is packed over
+# the old one through a writable memory map (or seek + write).  Nothing else
+# is read, decoded or rewritten, so a batch of patches costs
+# O(number of patches) whatever the size of the file.
+# Only fixed-width values can be patched: scalars, list elements and raw
+# fields.  Rep counts and strings are rejected, since changing their length
+# would move everything after them; use read_effdir + write_effdir for those.
+# All patches are validated before the first byte is written, against an
+# offset index verified for writing (effdir_index.verified_index): a file
+# replaced behind a matching size + mtime is rescanned, never written at
+# stale offsets.
+# Field paths are dotted: "speed", "more_dw.3", "prim_indx.0.indx_key",
+# "spiral_reps.2.5", "u1.u2.0" (sec4 columns).
+# Usage:
+#   python main.py patch big.eff --set 14:3:group_prop=7 --set 2:0:speed=1.5
+#   patch_effdir("big.eff", [(14, 3, "group_prop", 7), (2, 0, "speed", 1.5)])
+
+import mmap
+import os
+import struct
+
+from effdir_index import entry_span, file_identity, load_index, save_index, verified_index
+from effdir_schema import LAYOUTS, locate
+
+def parse_patch(spec):
+    """(section, index, field, value) from "SECTION:INDEX:FIELD=VALUE"."""
+    target, sep, value = spec.partition("=")
+    parts = target.split(":")
+    if not sep or len(parts) != 3:
+        raise ValueError(f"bad patch {spec!r}, expected SECTION:INDEX:FIELD=VALUE")
+    section, index, field = parts
+    return int(section), int(index), field, value
+
+def _normalize(patch):
+    if isinstance(patch, dict):
+        patch = (patch["section"], patch["index"], patch["field"], patch["value"])
+    section, index, field, value = patch
+    path = tuple(field.split(".")) if isinstance(field, str) else tuple(field)
+    return int(section), int(index), path, value
+
+def _encode(field, value, where):
+    """Packed bytes of `value` for the located field."""
+    st = struct.Struct("<" + field.code)
+    try:
+        if field.kind == "uint":
+            value = (int(value, 0) if isinstance(value, str) else int(value)).to_bytes(st.size, "little")
+        elif field.kind == "raw":
+            value = bytes.fromhex(value) if isinstance(value, str) else bytes(value)
+            if len(value) != st.size:
+                raise ValueError(f"needs exactly {st.size} bytes, got {len(value)}")
+        elif field.code == "f":
+            value = float(value)
+        elif isinstance(value, str):
+            value = int(value, 0)
+        return st.pack(value)
+    except (struct.error, TypeError, ValueError, OverflowError) as exc:
+        raise ValueError(f"{where}: bad value {value!r} for a {field.code!r} field: {exc}") from None
+
+def plan_patches(buf, index, patches, base=0):
+    """
+    [(offset, bytes)] for `patches` against the effdir in `buf` (the whole
+    file, or a slice starting at file offset `base` covering the entries).
+    """
+    out = []
+    for patch in patches:
+        section, i, path, value = _normalize(patch)
+        where = f"section {section} entry {i} {'.'.join(map(str, path))}"
+        if section not in LAYOUTS:
+            raise ValueError(f"unknown section {section}")
+        start, end = entry_span(index, section, i)
+        try:
+            offset, field = locate(LAYOUTS[section], buf, start - base, path)
+        except KeyError as exc:
+            raise ValueError(f"{where}: no field {exc}") from None
+        except (ValueError, IndexError) as exc:
+            raise ValueError(f"{where}: {exc}") from None
+        data = _encode(field, value, where)
+        if not (start <= offset + base and offset + base + len(data) <= end):
+            raise ValueError(f"{where}: field lies outside the entry")
+        out.append((offset + base, data))
+    return out
+
+def patch_effdir(filename, patches, index=None, use_mmap=True):
+    """
+    Apply `patches` to the .effdir `filename` in place.  Each patch is a
+    (section, index, field, value) tuple or {"section", "index", "field",
+    "value"} dict; field is a dotted path or a sequence of keys / indices.
+    Returns {"output", "patched", "bytes"} (bytes actually changed).
+    """
+    patches = list(patches)
+    if index is None:
+        index = load_index(filename, save=False)
+    with open(filename, "r+b") as f:
+        index = verified_index(filename, index, os.fstat(f.fileno()))
+        mm = None
+        if use_mmap and index["size"]:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+        try:
+            if mm is not None:
+                plan = plan_patches(mm, index, patches)
+            else:
+                plan = _plan_seek(f, index, patches)
+            changed = 0
+            for offset, data in plan:
+                if mm is not None:
+                    changed += sum(a != b for a, b in zip(mm[offset:offset + len(data)], data))
+                    mm[offset:offset + len(data)] = data
+                else:
+                    f.seek(offset)
+                    changed += sum(a != b for a, b in zip(f.read(len(data)), data))
+                    f.seek(offset)
+                    f.write(data)
+        finally:
+            if mm is not None:
+                mm.flush()
+                mm.close()
+    _refresh_index(filename, index)
+    return {"output": filename, "patched": len(plan), "bytes": changed}
+
+def _plan_seek(f, index, patches):
+    # read only the patched entries
+    plans = []
+    for patch in patches:
+        section, i, _path, _value = _normalize(patch)
+        start, end = entry_span(index, section, i)
+        f.seek(start)
+        plans += plan_patches(f.read(end - start), index, [patch], base=start)
+    return plans
+
+def _refresh_index(filename, index):
+    # lengths are unchanged, so every offset still holds; only the file's
+    # identity moved on (the content hash is dropped rather than recomputed)
+    index.update(file_identity(os.stat(filename)), hash=None)
+    try:
+        save_index(filename, index)
+    except OSError:
+        pass
@@ -0,0 +1,197 @@
+# effdir_records.py
+# Compact record types for parsed entries.
+# A parsed entry normally is a fresh dict (a Section 1 entry has ~60 keys)
+# whose every int and float is a separately boxed object.  In record mode
+# each entry becomes an instance of a generated __slots__ class instead: the
+# scalar fields are packed into one bytes object (uint32/float32 like in the
+# file, int64/float64 for anything wider, so values round-trip exactly) and
+# read back through generated properties, and strings/lists/nested entries
+# keep a slot each (lists stay lists, so a record compares equal to the dict
+# it came from).  Combine with curves=True to also get the over-time float
+# lists out of the entries.
+# Records behave like dicts (get, items, copy, ["key"], == dict, ...) so
+# isolate_eff, write_effdir and main.py keep working on them.
+# Usage:
+#   eff = read_effdir("some_effect.eff", records=True)
+#   e = eff["sec"][1]["entry"][0]
+#   e["resource_key"], e.resource_key, e.get("reps"), e.to_dict()
+
+import operator
+import struct
+from collections.abc import MutableMapping
+
+_UINT32_MAX = (1 << 32) - 1
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+class Record(MutableMapping):
+    """
+    Base class of the generated record types: a mutable mapping over the
+    class's fields.  Keys that are not fields go to a lazily created dict.
+    """
+    __slots__ = ("_data", "_extra")
+    _fields = ()
+    _field_set = frozenset()
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        try:
+            return self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            setattr(self, key, value)
+            return
+        try:
+            self._extra[key] = value
+        except AttributeError:
+            self._extra = {key: value}
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        try:
+            del self._extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+        yield from getattr(self, "_extra", ())
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def copy(self):
+        cls = type(self)
+        new = cls.__new__(cls)
+        new._data = self._data
+        for key in cls._objs:
+            if hasattr(self, key):
+                setattr(new, key, getattr(self, key))
+        if hasattr(self, "_extra"):
+            new._extra = dict(self._extra)
+        return new
+
+    def to_dict(self):
+        """Plain (recursive) dict/list copy, e.g. for JSON output."""
+        return {k: _plain(v) for k, v in self.items()}
+
+def _plain(v):
+    if isinstance(v, Record):
+        return v.to_dict()
+    if isinstance(v, (list, tuple)):
+        return [_plain(x) for x in v]
+    return v
+
+_SCALARS = {k: struct.Struct("<" + k) for k in "Iqfd"}
+_KIND_NAMES = {"I": "uint32", "q": "int64", "f": "float32", "d": "float64"}
+
+def _packed_field(name, kind, offset):
+    """Property reading/writing one scalar in the record's packed _data."""
+    s = _SCALARS[kind]
+    unpack_from, pack = s.unpack_from, s.pack
+    end = offset + s.size
+    convert = float if kind in "fd" else operator.index
+
+    def get(self):
+        return unpack_from(self._data, offset)[0]
+
+    def set(self, value):
+        try:
+            packed = pack(convert(value))
+        except (TypeError, struct.error):
+            raise TypeError(f"field {name!r} holds a {_KIND_NAMES[kind]}, got {value!r}") from None
+        data = self._data
+        self._data = data[:offset] + packed + data[end:]
+
+    return property(get, set, doc=f"{_KIND_NAMES[kind]} at byte {offset}")
+
+_TYPES = {}
+
+def record_type(name, fields, kinds):
+    """
+    Generated Record subclass `name` (cached).  kinds has one code per field:
+    a struct code ("I", "q", "f", "d") for packed scalars or "O" for a slot.
+    """
+    key = (name, fields, kinds)
+    cls = _TYPES.get(key)
+    if cls is None:
+        objs = tuple(f for f, k in zip(fields, kinds) if k == "O")
+        packed = [(f, k) for f, k in zip(fields, kinds) if k != "O"]
+        args = "".join(f", {f}" for f in objs)
+        body = "".join(f"\n    self.{f} = {f}" for f in objs)
+        ns = {}
+        exec(f"def __init__(self, _data{args}):\n    self._data = _data{body}", ns)
+        fmt = "<" + "".join(k for _, k in packed)
+        attrs = {
+            "__slots__": objs,
+            "__init__": ns["__init__"],
+            "_fields": fields,
+            "_field_set": frozenset(fields),
+            "_objs": objs,
+            "_struct": struct.Struct(fmt),
+        }
+        offset = 0
+        for f, k in packed:
+            attrs[f] = _packed_field(f, k, offset)
+            offset += _SCALARS[k].size
+        cls = _TYPES[key] = type(name, (Record,), attrs)
+    return cls
+
+def to_record(name, d, float32=False):
+    """
+    Convert one parsed dict (and its nested dicts/lists) into a record.
+    float32: the floats are known to be float32 values (as decoded from a
+             file) and may be stored in 4 bytes.
+    """
+    float_kind = "f" if float32 else "d"
+    kinds = []
+    scalars = []
+    objs = []
+    for key, v in d.items():
+        t = type(v)
+        if t is int:
+            if 0 <= v <= _UINT32_MAX:
+                kinds.append("I")
+                scalars.append(v)
+                continue
+            if _INT64_MIN <= v <= _INT64_MAX:
+                kinds.append("q")
+                scalars.append(v)
+                continue
+        elif t is float:
+            kinds.append(float_kind)
+            scalars.append(v)
+            continue
+        elif t is dict:
+            v = to_record(f"{name}_{key}", v, float32)
+        elif t is list:
+            if v and type(v[0]) is dict:
+                sub = f"{name}_{key}"
+                v = [to_record(sub, x, float32) for x in v]
+        kinds.append("O")
+        objs.append(v)
+    cls = record_type(name, tuple(d), "".join(kinds))
+    return cls(cls._struct.pack(*scalars), *objs)
+
+def record_reader(read_entry, name):
+    """Wrap an entry decoder (buf, pos) -> (dict, pos) to return records."""
+    def read(buf, pos):
+        e, pos = read_entry(buf, pos)
+        return to_record(name, e, float32=True), pos
+    return read
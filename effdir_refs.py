@@ -0,0 +1,123 @@
+# effdir_refs.py
+# Cross-reference graph between Section 12/13 and the entries they point at.
+# Built once per parsed effdir (O(references)); nodes are (section, index)
+# tuples with 0-based entry indices, e.g. (2, 57) is Section 2 entry 57.
+#   (13, i) -> (12, index_key)               effect name -> effect
+#   (12, i) -> (flag section, indx_key)      primary index (prim_indx)
+#   (12, i) -> (12, index_key)               secondary index (sec_indx)
+# Secondary edges are kept apart, in both directions, and only followed on
+# request (secondary=True), matching IsolateEff.m which copies primary
+# references only; closure and effects_using therefore always agree.
+# prim_refs is the one walk over a Section 12 entry's primary references;
+# the graph and the key-rewriting passes (isolate_effects, merge, dedupe)
+# all go through it.
+# Usage:
+#   g = RefGraph(read_effdir("some_effect.eff"))
+#   g.effects_using((2, 57))          # sec13 indices whose effect needs it
+#   g.closure([(12, 3)])              # everything effect 3 depends on
+
+from collections import defaultdict
+
+# prim_indx indx_flag -> section number (IsolateEff.m switch); other flags
+# are redirects/unknown and reference nothing we copy
+INDX_FLAG_SECTIONS = {0: 1, 1: 2, 3: 4, 4: 6, 5: 7, 6: 8, 7: 9, 8: 10, 10: 11}
+
+def _entries(effdir, nr):
+    return effdir["sec"].get(nr, {}).get("entry", [])
+
+def prim_refs(e12):
+    """
+    Yield (slot, section, key, p) for the prim_indx references of a
+    Section 12 entry: slot is the position in prim_indx, p the prim_indx
+    dict and section None for redirect / unknown flags.
+    """
+    for slot, p in enumerate(e12.get("prim_indx", [])):
+        yield slot, INDX_FLAG_SECTIONS.get(p.get("indx_flag")), p.get("indx_key", 0), p
+
+class RefGraph:
+    """Forward and reverse adjacency over an effdir's index references."""
+
+    def __init__(self, effdir):
+        self.forward = defaultdict(list)    # node -> [target, ...] (primary + sec13)
+        self.secondary = defaultdict(list)  # sec12 node -> [sec12 target, ...]
+        self.reverse = defaultdict(list)    # target -> [node, ...] (primary + sec13)
+        self.reverse_secondary = defaultdict(list)  # sec12 target -> [sec12 node, ...]
+        self.dangling = []                  # (node, slot, section, key) out of range
+        self.n_entries = {nr: len(_entries(effdir, nr)) for nr in range(1, 16)}
+
+        n12 = self.n_entries[12]
+        # the last sec13 entry is the closing entry, not an effect
+        for i, e in enumerate(_entries(effdir, 13)[:-1]):
+            self._add((13, i), 12, e.get("index_key", 0), 0, self.forward)
+
+        for i, e in enumerate(_entries(effdir, 12)):
+            node = (12, i)
+            for j, nr, key, _p in prim_refs(e):
+                if nr is not None:
+                    self._add(node, nr, key, j, self.forward)
+            for j, s in enumerate(e.get("sec_indx", [])):
+                key = s.get("index_key", 0)
+                if 0 <= key < n12:
+                    self.secondary[node].append((12, key))
+                    self.reverse_secondary[(12, key)].append(node)
+                else:
+                    self.dangling.append((node, j, 12, key))
+
+    def _add(self, node, nr, key, slot, edges):
+        if 0 <= key < self.n_entries[nr]:
+            target = (nr, key)
+            edges[node].append(target)
+            self.reverse[target].append(node)
+        else:
+            self.dangling.append((node, slot, nr, key))
+
+    def refs(self, node, secondary=False):
+        """Direct references of `node`."""
+        out = list(self.forward.get(node, ()))
+        if secondary:
+            out.extend(self.secondary.get(node, ()))
+        return out
+
+    def referrers(self, node, secondary=False):
+        """Nodes that reference `node` directly."""
+        out = list(self.reverse.get(node, ()))
+        if secondary:
+            out.extend(self.reverse_secondary.get(node, ()))
+        return out
+
+    def closure(self, nodes, secondary=False):
+        """`nodes` plus everything they reference, transitively."""
+        seen = set(nodes)
+        stack = list(seen)
+        while stack:
+            for target in self.refs(stack.pop(), secondary):
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    def reverse_closure(self, nodes, secondary=False):
+        """`nodes` plus everything that (transitively) references them."""
+        seen = set(nodes)
+        stack = list(seen)
+        while stack:
+            for src in self.referrers(stack.pop(), secondary):
+                if src not in seen:
+                    seen.add(src)
+                    stack.append(src)
+        return seen
+
+    def reachable(self, src, dst, secondary=False):
+        """True if `dst` is in the dependency closure of `src`."""
+        return dst in self.closure([src], secondary)
+
+    def effects_using(self, node, secondary=False):
+        """
+        Sorted 0-based sec13 indices of the effects that depend on `node`:
+        exactly those whose closure (same `secondary`) contains it.
+        """
+        return sorted(i for nr, i in self.reverse_closure([node], secondary) if nr == 13)
+
+    def unreferenced(self, nr, secondary=False):
+        """0-based entries of section `nr` that nothing references."""
+        return [i for i in range(self.n_entries[nr]) if not self.referrers((nr, i), secondary)]
@@ -0,0 +1,763 @@
+# effdir_schema.py
+# The binary layout of every effdir section, declared once, and the codec
+# generator that turns it into specialized functions for read_effdir and
+# write_effdir.
+# A layout is the tuple of items of one entry in file order:
+#   u8/u16/u32/i8/f32(name)   scalars
+#   uint(name, n)             n-byte little-endian unsigned int (ubit40/48)
+#   dwords(name, n)           n uint32s kept as one list
+#   raw(name, n)              n raw bytes (zero-copy slice of the buffer)
+#   array(name, code, ...)    uint32 count + count (x width) 4-byte values
+#   string(name)              uint32 length + latin1 characters
+#   records(name, items)      uint32 count + count nested entries
+# Counted items store their count under `rep` when given (e.g. "str_rep").
+# make_codec() merges consecutive fixed-size items (including the counts)
+# into one precompiled struct.Struct each and generates Python source for a
+# reader, a skipper and a size/pack pair from the same plan, so the parsed
+# dicts are exactly what the writer takes and any layout change applies to
+# both directions at once.
+# Usage:
+#   from effdir_schema import CODECS
+#   entry, end = CODECS[13].read(buf, pos)
+#   CODECS[13].pack(out, 0, entry)   # out: bytearray(CODECS[13].size(entry))
+
+import struct
+from collections import namedtuple
+from functools import lru_cache
+from itertools import chain
+
+# ---------------------------
+# Layout items
+# ---------------------------
+
+class Field:
+    """A fixed-size value; consecutive fields share one struct run."""
+    __slots__ = ("name", "code", "kind", "width")
+
+    def __init__(self, name, code, kind="value", width=1):
+        self.name = name
+        self.code = code     # struct format of the field
+        self.kind = kind     # "value", "uint" (from n bytes), "list" or "count"
+        self.width = width   # values taken from the unpacked tuple
+
+class Raw:
+    __slots__ = ("name", "size")
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+class Array:
+    """
+    Counted 4-byte values.  width > 1 groups them into rows: `rows` (tuple or
+    list) per rep, `split` into that many top-level lists (sec2 red/green/
+    blue) or `columns` into a dict of lists under `name` (sec4 u1).
+    curve: stored in effdir_curves' ragged storage when the reader is given
+    a curve store.
+    """
+    __slots__ = ("name", "code", "rep", "width", "rows", "split", "columns", "curve")
+
+    def __init__(self, name, code, rep=None, width=1, rows=None, split=None, columns=None, curve=False):
+        self.name = name
+        self.code = code
+        self.rep = rep
+        self.width = width
+        self.rows = rows
+        self.split = split
+        self.columns = columns
+        self.curve = curve
+
+class String:
+    __slots__ = ("name", "rep")
+
+    def __init__(self, name, rep=None):
+        self.name = name
+        self.rep = rep
+
+class Records:
+    __slots__ = ("name", "items", "rep")
+
+    def __init__(self, name, items, rep=None):
+        self.name = name
+        self.items = tuple(items)
+        self.rep = rep
+
+def u8(name): return Field(name, "B")
+def u16(name): return Field(name, "H")
+def u32(name): return Field(name, "I")
+def i8(name): return Field(name, "b")
+def f32(name): return Field(name, "f")
+def uint(name, n): return Field(name, f"{n}s", "uint")
+def dwords(name, n): return Field(name, f"{n}I", "list", n)
+def raw(name, n): return Raw(name, n)
+def array(name, code, **kw): return Array(name, code, **kw)
+def string(name, rep=None): return String(name, rep)
+def records(name, items, rep=None): return Records(name, items, rep)
+
+def _u32s(*names): return tuple(map(u32, names))
+def _f32s(*names): return tuple(map(f32, names))
+
+# ---------------------------
+# Section layouts
+# ---------------------------
+
+SEC1 = (
+    _u32s("dword1", "constant0", "dword2",
+          "duration_min", "duration_max", "released_high_detail", "repeat_flag",
+          "dword3", "dword4", "dword5",
+          "time_delay_min", "time_delay_max",
+          "x_push_min", "z_push_min", "y_push_min", "x_push_max", "z_push_max", "y_push_max",
+          "velocity_min", "velocity_max",
+          "x_shift_min", "z_shift_min", "y_shift_min", "x_shift_max", "z_shift_max", "y_shift_max",
+          "initial_size_var_pct", "x_stretch_max", "spin_var_max", "dword6",
+          "alpha_var_max", "color_var_r", "color_var_g", "color_var_b")
+    + (
+        array("reps", "I"),
+        array("color_adj_over_time", "f", width=3, rows=tuple, curve=True),
+        array("brightness_over_time", "f", curve=True),
+        array("size_over_time", "f", curve=True),
+        array("xstretch_over_time", "f", curve=True),
+        array("spin_over_time", "I"),
+        # resource key, 2 unknown bytes, movement/forces, 9 more DWORDs
+        u32("resource_key"), u16("two_bytes"),
+    )
+    + _u32s("d1", "direction_of_travel_blur", "x_force", "z_force", "y_force", "carry")
+    + (
+        dwords("more_dw", 9),
+        u32("spiral_travel_max"),
+        # 28-byte spiral reps -> 7 floats each
+        array("spiral_reps", "f", width=7, rows=list, curve=True),
+        dwords("post_spiral_dw", 5),
+        # 32-byte coordinate reps -> 8 floats each (X,Z,Y,X,Z,Y,seq,seq)
+        array("coord_reps", "f", width=8, rows=list, curve=True),
+        records("sub_entries", (string("str"), u32("dw"))),
+        u32("tail_dw1"), u32("tail_dw2"),
+        array("list_resource_keys", "I", rep="list_resource_keys_rep"),
+        dwords("tail_more", 3),
+        array("next_list", "I"),
+        # end-of-entry marker (float probably 0x40800000)
+        u32("entry_end_marker"),
+    )
+)
+
+SEC2 = (
+    u32("u1"), u32("resource_key"), u8("inverse_flg"), u8("repeat_flg"), f32("speed"),
+    array("rotation_over_time", "f", rep="rotation_over_time_rep", curve=True),
+    array("size_over_time_pc", "f", rep="size_over_time_rep", curve=True),
+    array("alpha_over_time_pc", "f", rep="alpha_over_time_rep", curve=True),
+    array("color_adj_over_time", "f", rep="color_adj_over_time_rep", width=3,
+          split=("red", "green", "blue"), curve=True),
+    array("y_axis_stretch_over_time_pc", "f", rep="y_axis_stretch_over_time_rep", curve=True),
+) + _f32s("initial_intensity_var", "initial_size_var", "u2", "u3", "u4", "u5")
+
+SEC3 = (
+    f32("u1"), f32("u2"),
+    array("u3", "f", rep="u3_rep"),
+    array("u4", "f", rep="u4_rep"),
+    u16("u5"), u8("u6"), u16("u7"),
+)
+
+SEC4 = (
+    array("u1", "f", rep="u1_rep", width=3, columns=("u1", "u2", "u3")),
+    array("u2", "f", rep="u2_rep"),
+    f32("u3"),
+)
+
+# fixed 39-byte records, u3b is ubit40
+SEC5 = (
+    u8("u1"), u8("u2"), u32("resource_key"), f32("u3"), f32("u4"), uint("u3b", 5),
+) + _f32s("u5", "u6", "u7", "u8", "u9")
+
+SEC6 = (u16("u1"), string("str", rep="str_rep"), u8("type_id"))
+
+# fixed 66-byte records; MATLAB used ubit58 etc., the leading 22 bytes are kept raw
+SEC7 = (
+    raw("u1_raw", 22), f32("u2"),
+) + _u32s("u3", "u4", "u5", "u5b") + _f32s("u6", "u7", "u8", "u9") + _u32s("u10", "u11", "u12")
+
+SEC8 = (
+    u16("u1"),
+    records("u2", (f32("u1"), f32("u2"), string("str", rep="str_rep")), rep="u2_rep"),
+    u32("u3"),
+)
+
+# fixed 18-byte records, u1 is ubit48
+SEC9 = (uint("u1", 6), u32("sound_resource_key"), f32("u2"), f32("u3"))
+
+SEC10 = _f32s("u1", "u2", "u3")
+
+SEC11 = (
+    u32("u1"), string("str", rep="str_rep"),
+) + _u32s("u2", "u3", "u4") + _f32s("u5", "u6", "u7", "u8", "u9")
+
+# u11a/u11b are ubit40
+SEC12_PRIM = (
+    string("str", rep="str_rep"),
+    u8("indx_flag"), f32("u1"), f32("u2"), u32("u3a"), u32("u3b"),
+) + _f32s("u4", "u5", "u6", "u7", "u8", "u9", "xshift", "zshift", "yshift", "u10") + (
+    uint("u11a", 5), uint("u11b", 5),
+) + _f32s("u12", "u13", "u14", "u15") + (u16("u16"), u16("u17"), u32("indx_key"))
+
+SEC12_SEC = (u32("u1"), string("str", rep="str_rep"), u32("u2"), u32("index_key"))
+
+SEC12 = (
+    u32("u1"), u32("u2"),
+    records("prim_indx", SEC12_PRIM, rep="prim_indx_rep"),
+    records("sec_indx", SEC12_SEC, rep="sec_indx_rep"),
+) + _u32s("u3", "u4", "u5", "u6")
+
+# Main Effect Directory; MATLAB loops sec12.n_entries + 1 times
+SEC13 = (string("str", rep="str_rep"), u32("index_key"))
+
+# fixed 41-byte block between sections 13 and 14
+SEC135 = (i8("u1"), u32("u2")) + _f32s("u3", "u4", "u5", "u6", "u7", "u8", "u9", "u10", "u11")
+
+SEC14 = (string("str", rep="str_rep"), u32("group_prop"), u32("instance_prop"))
+
+SEC15 = (u32("class_id"), string("str", rep="str_rep"))
+
+Section = namedtuple("Section", "nr layout eos")
+
+# Counted sections in file order: a uint32 entry count, the entries and, if
+# eos is not None, a trailing uint16 end-of-section marker (eos is the value
+# written when a section has none).  Section 13 (no count, sec12 n_entries
+# + 1 entries, two uint8 markers) and the 13.5 block sit between 12 and 14.
+SECTIONS = (
+    Section(1, SEC1, 0x0001),
+    Section(2, SEC2, 0x0000),
+    Section(3, SEC3, 0x0000),
+    Section(4, SEC4, None),  # EOS for sec4 commented out in MATLAB
+    Section(5, SEC5, None),
+    Section(6, SEC6, None),
+    Section(7, SEC7, None),
+    Section(8, SEC8, None),
+    Section(9, SEC9, None),
+    Section(10, SEC10, 0x0001),
+    Section(11, SEC11, 0x0002),
+    Section(12, SEC12, None),
+    Section(14, SEC14, 0x0000),
+    Section(15, SEC15, None),
+)
+
+LAYOUTS = {s.nr: s.layout for s in SECTIONS}
+LAYOUTS[13] = SEC13
+
+# ---------------------------
+# Runtime helpers of the generated code
+# ---------------------------
+
+_U32 = struct.Struct("<I")
+_u32 = _U32.unpack_from
+
+# precompiled "<nf" / "<nI" layouts for the common short rep counts
+_ARRAY_CACHED = 64
+_ARRAY_STRUCTS = {
+    code: [struct.Struct(f"<{n}{code}") for n in range(_ARRAY_CACHED + 1)]
+    for code in ("f", "I")
+}
+
+def _array_struct(code, n):
+    if n <= _ARRAY_CACHED:
+        return _ARRAY_STRUCTS[code][n]
+    return struct.Struct(f"<{n}{code}")
+
+def _array(buf, pos, code, n):
+    """Decode n consecutive 4-byte values of one struct code ('f' or 'I')."""
+    if not n:
+        return [], pos
+    return list(_array_struct(code, n).unpack_from(buf, pos)), pos + 4 * n
+
+def _string(buf, pos, n):
+    if not n:
+        return "", pos
+    end = pos + n
+    if end > len(buf):
+        raise EOFError(f"Unexpected EOF while reading {n} bytes at offset {pos}")
+    return str(buf[pos:end], "latin1", "ignore"), end
+
+def _raw(buf, pos, n):
+    end = pos + n
+    if end > len(buf):
+        raise EOFError(f"Unexpected EOF while reading {n} bytes at offset {pos}")
+    return buf[pos:end], end
+
+def _le(raw):
+    return int.from_bytes(raw, byteorder="little", signed=False)
+
+def _le_bytes(v, n):
+    return int(v).to_bytes(n, "little")
+
+def _groups(vals, width):
+    return [vals[i:i + width] for i in range(0, len(vals), width)]
+
+def _enc(s):
+    # a missing string writes as empty
+    if s is None:
+        return b""
+    if isinstance(s, str):
+        return s.encode("latin1", "replace")
+    return bytes(s)
+
+def _pad(b, n):
+    # exactly n bytes: zero padded or truncated
+    b = bytes(b)
+    return b[:n] if len(b) >= n else b + b"\0" * (n - len(b))
+
+def _columns(d, keys):
+    return [d.get(k, ()) for k in keys] if d else [()] * len(keys)
+
+_RUNTIME = {
+    "_u32": _u32, "_U32": _U32, "_array": _array, "_array_struct": _array_struct,
+    "_string": _string, "_raw": _raw, "_le": _le, "_le_bytes": _le_bytes,
+    "_groups": _groups, "_enc": _enc, "_pad": _pad, "_columns": _columns,
+    "_chain": chain.from_iterable,
+}
+
+# ---------------------------
+# Codec generator
+# ---------------------------
+
+class _Run:
+    """Consecutive fixed-size fields; a trailing count belongs to the next item."""
+    __slots__ = ("fields", "struct", "offsets")
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.struct = struct.Struct("<" + "".join(f.code for f in fields))
+        self.offsets = []
+        off = 0
+        for f in fields:
+            self.offsets.append(off)
+            off += struct.calcsize("<" + f.code)
+
+def _plan(items):
+    """Split a layout into struct runs and the items between them."""
+    steps, run = [], []
+    for item in items:
+        if isinstance(item, Field):
+            run.append(item)
+            continue
+        if isinstance(item, Raw):
+            if run:
+                steps.append(_Run(run))
+                run = []
+        else:
+            run.append(Field(item.rep, "I", "count"))
+            steps.append(_Run(run))
+            run = []
+        steps.append(item)
+    if run:
+        steps.append(_Run(run))
+    return steps
+
+def fixed_size(items):
+    """Byte size of every entry of a layout, or None if it varies."""
+    size = 0
+    for item in items:
+        if isinstance(item, Field):
+            size += struct.calcsize("<" + item.code)
+        elif isinstance(item, Raw):
+            size += item.size
+        else:
+            return None
+    return size
+
+def _has_curves(items):
+    return any(isinstance(i, Array) and i.curve or isinstance(i, Records) and _has_curves(i.items)
+               for i in items)
+
+class _Source:
+    def __init__(self, track=None):
+        self.lines = []
+        self.consts = {}
+        self.n = 0
+        self.track = track
+
+    def const(self, value):
+        name = f"_S{len(self.consts)}"
+        self.consts[name] = value
+        return name
+
+    def var(self, prefix):
+        self.n += 1
+        return f"{prefix}{self.n}"
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def compile(self, name):
+        ns = dict(_RUNTIME)
+        ns.update(self.consts)
+        if self.track:
+            ns.update({f"_track_{k}": v for k, v in self.track.items()})
+        exec("\n".join(self.lines), ns)
+        return ns[name]
+
+def _display(fields):
+    return "{" + ", ".join(f"{k!r}: {v}" for k, v in fields) + "}"
+
+def _list(src, values, plain=None):
+    """Expression of a new entry list holding the iterable `values`."""
+    if src.track:
+        return f"_track_list(root, {values})"
+    return plain or f"list({values})"
+
+def _dict(src, display):
+    return f"_track_dict(root, {display})" if src.track else display
+
+def _array_fields(src, item, a):
+    """(key, expr) of a decoded Array given its flat value list `a`."""
+    w = item.width
+    if w == 1:
+        return [(item.name, _list(src, a, a))]
+    strided = [f"{a}[{i}::{w}]" for i in range(w)]
+    if item.split:
+        return [(k, _list(src, v, v)) for k, v in zip(item.split, strided)]
+    if item.columns:
+        return [(item.name, _dict(src, _display((k, _list(src, v, v)) for k, v in zip(item.columns, strided))))]
+    if item.rows is tuple:
+        return [(item.name, _list(src, "zip(" + ", ".join(strided) + ")"))]
+    if src.track:
+        return [(item.name, f"_track_groups(root, {a}, {w})")]
+    return [(item.name, f"_groups({a}, {w})")]
+
+def _curve_fields(item, c):
+    if item.split:
+        return [(k, f"curves[{item.name!r}].view({c}.i, {i})") for i, k in enumerate(item.split)]
+    return [(item.name, c)]
+
+def _read_body(src, items, indent):
+    """Emit statements decoding `items`; returns the (key, expr) pairs of the entry."""
+    fields = []
+    count = None
+    for step in _plan(items):
+        if isinstance(step, _Run):
+            v = src.var("v")
+            if len(step.fields) == 1 and step.fields[0].kind == "count":
+                src.emit(indent, f"{v} = _u32(buf, pos)")
+            else:
+                src.emit(indent, f"{v} = {src.const(step.struct)}.unpack_from(buf, pos)")
+            src.emit(indent, f"pos += {step.struct.size}")
+            i = 0
+            for f in step.fields:
+                if f.kind == "count":
+                    count = src.var("n")
+                    src.emit(indent, f"{count} = {v}[{i}]")
+                    if f.name:
+                        fields.append((f.name, count))
+                elif f.kind == "uint":
+                    fields.append((f.name, f"_le({v}[{i}])"))
+                elif f.kind == "list":
+                    fields.append((f.name, _list(src, f"{v}[{i}:{i + f.width}]")))
+                else:
+                    fields.append((f.name, f"{v}[{i}]"))
+                i += f.width
+        elif isinstance(step, Raw):
+            r = src.var("r")
+            src.emit(indent, f"{r}, pos = _raw(buf, pos, {step.size})")
+            fields.append((step.name, r))
+        elif isinstance(step, Array):
+            a = src.var("a")
+            total = count if step.width == 1 else f"{step.width} * {count}"
+            if not step.curve:
+                src.emit(indent, f"{a}, pos = _array(buf, pos, {step.code!r}, {total})")
+                fields += _array_fields(src, step, a)
+                continue
+            # same values either way; the curve store keeps them as float32
+            plain, ragged = _array_fields(src, step, a), _curve_fields(step, a)
+            names = [src.var("x") for _ in plain]
+            src.emit(indent, "if curves is None:")
+            src.emit(indent + 1, f"{a}, pos = _array(buf, pos, {step.code!r}, {total})")
+            for x, (_k, expr) in zip(names, plain):
+                src.emit(indent + 1, f"{x} = {expr}")
+            src.emit(indent, "else:")
+            src.emit(indent + 1, f"{a}, pos = curves[{step.name!r}].extend(buf, pos, {count})")
+            for x, (_k, expr) in zip(names, ragged):
+                src.emit(indent + 1, f"{x} = {expr}")
+            fields += [(k, x) for x, (k, _e) in zip(names, plain)]
+        elif isinstance(step, String):
+            s = src.var("s")
+            src.emit(indent, f"{s}, pos = _string(buf, pos, {count})")
+            fields.append((step.name, s))
+        else:
+            lst = src.var("l")
+            src.emit(indent, f"{lst} = []")
+            src.emit(indent, f"for _ in range({count}):")
+            sub = _read_body(src, step.items, indent + 1)
+            src.emit(indent + 1, f"{lst}.append({_dict(src, _display(sub))})")
+            fields.append((step.name, _list(src, lst, lst)))
+    return fields
+
+def _skip_body(src, items, indent, off=0):
+    """Emit statements stepping over `items`; returns the pending constant offset."""
+    count = None
+    for step in _plan(items):
+        if isinstance(step, _Run):
+            last = step.fields[-1]
+            if last.kind == "count":
+                count = src.var("n")
+                src.emit(indent, f"{count} = _u32(buf, pos + {off + step.offsets[-1]})[0]")
+            off += step.struct.size
+        elif isinstance(step, Raw):
+            off += step.size
+        elif isinstance(step, Array):
+            src.emit(indent, f"pos += {off} + {4 * step.width} * {count}")
+            off = 0
+        elif isinstance(step, String):
+            src.emit(indent, f"pos += {off} + {count}")
+            off = 0
+        else:
+            size = fixed_size(step.items)
+            if size is not None:
+                src.emit(indent, f"pos += {off} + {size} * {count}")
+            else:
+                if off:
+                    src.emit(indent, f"pos += {off}")
+                src.emit(indent, f"for _ in range({count}):")
+                rest = _skip_body(src, step.items, indent + 1)
+                if rest:
+                    src.emit(indent + 1, f"pos += {rest}")
+            off = 0
+    return off
+
+def _counted_value(step, get):
+    """Expression of the value behind a counted item, as the writer packs it."""
+    name = step.name
+    if isinstance(step, String):
+        return f"_enc({get}({name!r}, None))"
+    if isinstance(step, Array) and step.split:
+        return "list(zip(" + ", ".join(f"{get}({k!r}, ())" for k in step.split) + "))"
+    if isinstance(step, Array) and step.columns:
+        return f"list(zip(*_columns({get}({name!r}, None), {step.columns!r})))"
+    return f"{get}({name!r}, ())"
+
+def _size_body(src, items, indent, get):
+    """Emit `size += ...` statements for `items`; returns their constant size."""
+    static = 0
+    for step in _plan(items):
+        if isinstance(step, _Run):
+            static += step.struct.size
+        elif isinstance(step, Raw):
+            static += step.size
+        elif isinstance(step, Array):
+            if step.split:
+                n = "min(" + ", ".join(f"len({get}({k!r}, ()))" for k in step.split) + ")"
+            elif step.columns:
+                n = f"len({_counted_value(step, get)})"
+            else:
+                n = f"len({get}({step.name!r}, ()))"
+            src.emit(indent, f"size += {4 * step.width} * {n}")
+        elif isinstance(step, String):
+            src.emit(indent, f"size += len({_counted_value(step, get)})")
+        else:
+            sub_size = fixed_size(step.items)
+            if sub_size is not None:
+                src.emit(indent, f"size += {sub_size} * len({get}({step.name!r}, ()))")
+                continue
+            r, sub_get = src.var("r"), src.var("g")
+            src.emit(indent, f"for {r} in {get}({step.name!r}, ()):")
+            src.emit(indent + 1, f"{sub_get} = {r}.get")
+            sub_static = _size_body(src, step.items, indent + 1, sub_get)
+            src.emit(indent + 1, f"size += {sub_static}")
+    return static
+
+def _pack_body(src, items, indent, get):
+    """Emit statements packing `items` into buf at pos."""
+    value = count = None
+    steps = _plan(items)
+    for k, step in enumerate(steps):
+        if isinstance(step, _Run):
+            args = []
+            for f in step.fields:
+                if f.kind == "count":
+                    value, count = src.var("x"), src.var("n")
+                    src.emit(indent, f"{value} = {_counted_value(steps[k + 1], get)}")
+                    src.emit(indent, f"{count} = len({value})")
+                    args.append(count)
+                elif f.kind == "uint":
+                    args.append(f"_le_bytes({get}({f.name!r}, 0), {struct.calcsize(f.code)})")
+                elif f.kind == "list":
+                    args.append(f"*{get}({f.name!r}, {(0,) * f.width!r})")
+                else:
+                    args.append(f"{get}({f.name!r}, 0)")
+            src.emit(indent, f"{src.const(step.struct)}.pack_into(buf, pos, {', '.join(args)})")
+            src.emit(indent, f"pos += {step.struct.size}")
+        elif isinstance(step, Raw):
+            src.emit(indent, f"buf[pos:pos + {step.size}] = _pad({get}({step.name!r}, b''), {step.size})")
+            src.emit(indent, f"pos += {step.size}")
+        elif isinstance(step, Array):
+            vals = value if step.width == 1 else f"_chain({value})"
+            total = count if step.width == 1 else f"{step.width} * {count}"
+            src.emit(indent, f"_array_struct({step.code!r}, {total}).pack_into(buf, pos, *{vals})")
+            src.emit(indent, f"pos += {4 * step.width} * {count}")
+        elif isinstance(step, String):
+            src.emit(indent, f"buf[pos:pos + {count}] = {value}")
+            src.emit(indent, f"pos += {count}")
+        else:
+            r, sub_get = src.var("r"), src.var("g")
+            src.emit(indent, f"for {r} in {value}:")
+            src.emit(indent + 1, f"{sub_get} = {r}.get")
+            _pack_body(src, step.items, indent + 1, sub_get)
+
+@lru_cache(maxsize=None)
+def _cached_plan(items):
+    return _plan(items)
+
+def _skip_records(step, buf, pos, n):
+    size = fixed_size(step.items)
+    if size is not None:
+        return pos + size * n
+    skip = _records_codec(step).skip
+    for _ in range(n):
+        pos = skip(buf, pos)
+    return pos
+
+_RECORD_CODECS = {}
+
+def _records_codec(step):
+    codec = _RECORD_CODECS.get(id(step))
+    if codec is None:
+        codec = _RECORD_CODECS[id(step)] = make_codec(step.items, step.name)
+    return codec
+
+def _element(path, n, name):
+    if not path:
+        raise ValueError(f"{name!r} is a list; give an element index")
+    try:
+        i = int(path[0])
+    except ValueError:
+        raise ValueError(f"bad index {path[0]!r} into {name!r}") from None
+    if not 0 <= i < n:
+        raise IndexError(f"{name!r} index {i} out of range ({n} items)")
+    return i, path[1:]
+
+def _no_more(path, name):
+    if path:
+        raise ValueError(f"{name!r} has no field {'.'.join(map(str, path))!r}")
+
+def locate(items, buf, pos, path):
+    """
+    Find the fixed-width value at `path` (a sequence of field names and
+    list indices, e.g. ("prim_indx", 0, "indx_key") or ("more_dw", 3)) in
+    the entry of layout `items` starting at buf[pos].  Returns (offset,
+    Field) with the Field's code / kind describing the value there.
+    Length fields (rep counts, strings) raise ValueError: changing them
+    would move everything after them.
+    """
+    key, rest = str(path[0]), tuple(path[1:])
+    count = None
+    for step in _cached_plan(items):
+        if isinstance(step, _Run):
+            for f, off in zip(step.fields, step.offsets):
+                if f.kind == "count":
+                    count = _u32(buf, pos + off)[0]
+                    if f.name == key:
+                        raise ValueError(f"{key!r} is a length field")
+                elif f.name == key:
+                    if f.kind == "list":
+                        i, rest = _element(rest, f.width, key)
+                        _no_more(rest, key)
+                        return pos + off + 4 * i, Field(key, f.code[-1])
+                    _no_more(rest, key)
+                    return pos + off, f
+            pos += step.struct.size
+        elif isinstance(step, Raw):
+            if step.name == key:
+                _no_more(rest, key)
+                return pos, Field(key, f"{step.size}s", "raw")
+            pos += step.size
+        elif isinstance(step, Array):
+            w = step.width
+            if key == step.name and step.columns:
+                if not rest or rest[0] not in step.columns:
+                    raise ValueError(f"{key!r} has the columns {step.columns}")
+                j = step.columns.index(rest[0])
+                i, rest = _element(rest[1:], count, f"{key}.{step.columns[j]}")
+            elif key in (step.split or ()):
+                j = step.split.index(key)
+                i, rest = _element(rest, count, key)
+            elif key == step.name and not step.split:
+                i, rest = _element(rest, count, key)
+                j = 0
+                if w > 1:
+                    j, rest = _element(rest, w, f"{key}.{i}")
+            else:
+                pos += 4 * w * count
+                continue
+            _no_more(rest, key)
+            return pos + 4 * (w * i + j), Field(key, step.code)
+        elif isinstance(step, String):
+            if step.name == key:
+                raise ValueError(f"{key!r} is a string; its length is stored in the file")
+            pos += count
+        else:
+            if step.name == key:
+                i, rest = _element(rest, count, key)
+                if not rest:
+                    raise ValueError(f"{key}.{i} is a record; give one of its fields")
+                return locate(step.items, buf, _skip_records(step, buf, pos, i), rest)
+            pos = _skip_records(step, buf, pos, count)
+    raise KeyError(key)
+
+Codec = namedtuple("Codec", "read skip size pack fixed_size")
+
+def make_reader(items, name="entry", track=None):
+    """
+    Generate read(buf, pos[, curves]) -> (entry, end) for a layout; curves=
+    is taken when the layout has curve arrays.
+    track: optional hooks building the entry out of other containers
+           instead of plain dicts and lists:
+             entry() -> new empty entry (the root)
+             finish(root, fields, buf, start, end) -> entry, fields the dict
+             list(root, iterable), dict(root, d), groups(root, values, width)
+    """
+    items = tuple(items)
+    src = _Source(track)
+    src.emit(0, f"def read_{name}(buf, pos{', curves=None' if _has_curves(items) else ''}):")
+    if track:
+        src.emit(1, "start = pos")
+        src.emit(1, "root = _track_entry()")
+    fields = _read_body(src, items, 1)
+    if track:
+        src.emit(1, f"return _track_finish(root, {_display(fields)}, buf, start, pos), pos")
+    else:
+        src.emit(1, f"return {_display(fields)}, pos")
+    return src.compile(f"read_{name}")
+
+def make_codec(items, name="entry"):
+    """
+    Generate the codec of one layout:
+      read(buf, pos[, curves]) -> (entry dict, end)
+      skip(buf, pos) -> end
+      size(entry) -> encoded byte size
+      pack(buf, pos, entry) -> end, buf a preallocated bytearray
+    Missing entry keys are written as zeros / empty.
+    """
+    items = tuple(items)
+    read = make_reader(items, name)
+
+    size = fixed_size(items)
+    src = _Source()
+    src.emit(0, f"def skip_{name}(buf, pos):")
+    rest = _skip_body(src, items, 1)
+    src.emit(1, f"return pos + {rest}")
+    skip = src.compile(f"skip_{name}")
+
+    src = _Source()
+    src.emit(0, f"def size_{name}(e):")
+    src.emit(1, "size = 0")
+    src.emit(1, "g = e.get")
+    static = _size_body(src, items, 1, "g")
+    src.emit(1, f"return size + {static}")
+    size_of = src.compile(f"size_{name}")
+
+    src = _Source()
+    src.emit(0, f"def pack_{name}(buf, pos, e):")
+    src.emit(1, "g = e.get")
+    _pack_body(src, items, 1, "g")
+    src.emit(1, "return pos")
+    pack = src.compile(f"pack_{name}")
+    return Codec(read, skip, size_of, pack, size)
+
+CODECS = {nr: make_codec(layout, f"sec{nr}_entry") for nr, layout in LAYOUTS.items()}
+SEC135_CODEC = make_codec(SEC135, "sec135")
@@ -0,0 +1,214 @@
+# effdir_server.py
+# Resident server for main.py: keeps parsed effdirs in memory (see
+# effdir_cache.MemoryCache) so repeated commands skip process startup and
+# parsing.  Listens on localhost HTTP only by default (works the same for the
+# Windows EXE).
+# Endpoints (JSON request bodies):
+#   POST /run      {"argv": [...], "cwd": "..."} -> {"exit", "stdout", "stderr"}
+#                  runs a main.py command line exactly like the CLI would
+#   POST /read     {"input"}                       -> effdir as JSON
+#   POST /query    {"input", "section", "index"?, "fields"?} -> entries
+#   POST /isolate  {"input", "index", "name", "output"?} -> {"output", "bytes"}
+#                  or the isolated .effdir bytes when no output is given
+#   POST /write    {"effdir", "output"?}           -> {"output", "bytes"} or bytes
+#   GET  /stats                                    -> cache statistics
+#   POST /shutdown
+# Bytes values (e.g. sec7 u1_raw) are sent as {"__bytes__": "<base64>"}.
+# Every request must carry the per-session token printed at startup as
+# "Authorization: Bearer <token>"; POST bodies must be application/json.
+# Requests with an Origin header (i.e. from a web page) or a Host header
+# naming anything but this server are refused, so browsers cannot drive
+# the server through cross-site or DNS-rebinding requests.
+# Usage:
+#   python main.py serve --port 8765                  # prints the token
+#   EFFDIR_SERVER_TOKEN=<token> python main.py --server http://127.0.0.1:8765 read some_effect.eff
+
+import hmac
+import io
+import json
+import os
+import secrets
+import sys
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from contextlib import redirect_stderr, redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from effdir_cache import DEFAULT_MEMORY_BYTES, MemoryCache, unfreeze
+from effdir_json import decode_bytes
+from isolate_eff import isolate_eff
+from effdir_cli import build_parser, format_json, json_default, query_entries, resolve_paths, run_command, write_read
+from write_effdir import effdir_to_bytes
+
+class EffdirServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, max_bytes=DEFAULT_MEMORY_BYTES, token=None):
+        super().__init__(address, _Handler)
+        self.cache = MemoryCache(max_bytes)
+        # shared secret for this session; the client sends it as a bearer token
+        self.token = token or secrets.token_urlsafe(32)
+        port = self.server_address[1]
+        self.allowed_hosts = {f"{host}:{port}" for host in
+                              ("127.0.0.1", "localhost", "[::1]", address[0], f"[{address[0]}]")}
+        # /run redirects the process-wide stdout/stderr
+        self.run_lock = threading.Lock()
+
+    def run_argv(self, argv, cwd):
+        out, err = io.StringIO(), io.StringIO()
+        code = 0
+        with self.run_lock, redirect_stdout(out), redirect_stderr(err):
+            try:
+                args = build_parser().parse_args(argv)
+                if args.cmd == "serve":
+                    raise ValueError("'serve' cannot be forwarded to a server")
+                # the server's working directory is not the client's
+                resolve_paths(args, cwd)
+                if args.cmd == "read":
+                    write_read(args, load=self.cache.get)
+                else:
+                    print(format_json(unfreeze(run_command(args, load=self.cache.get))))
+            except SystemExit as exc:  # argparse errors and --help
+                code = exc.code if isinstance(exc.code, int) else 2
+            except Exception:
+                print("ERROR during command execution:", file=sys.stderr)
+                traceback.print_exc()
+                code = 2
+        return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+    def isolate(self, req):
+        ne = isolate_eff(self.cache.get(req["input"]), int(req["index"]), req["name"])
+        return effdir_to_bytes(ne)
+
+    def query(self, req):
+        effdir = self.cache.get(req["input"])
+        entries = enumerate(effdir["sec"][int(req["section"])].get("entry", []))
+        return query_entries(entries, req.get("index"), req.get("fields"))
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "EffDirEditor"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body, default=json_default, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_data(self, data, output):
+        if output:
+            with open(output, "wb") as f:
+                f.write(data)
+            self._reply(200, {"output": output, "bytes": len(data)})
+        else:
+            self._reply(200, bytes(data), "application/octet-stream")
+
+    def _refuse(self, require_json):
+        """Reply with an error and return True unless the request may be served."""
+        srv = self.server
+        if self.headers.get("Origin") is not None:
+            self._reply(403, {"error": "cross-origin requests are not allowed"})
+        elif (self.headers.get("Host") or "").lower() not in srv.allowed_hosts:
+            self._reply(403, {"error": "unexpected Host header"})
+        elif not hmac.compare_digest((self.headers.get("Authorization") or "").encode("utf-8"),
+                                     f"Bearer {srv.token}".encode("utf-8")):
+            self._reply(401, {"error": "missing or wrong token"})
+        elif require_json and (self.headers.get("Content-Type") or "").split(";")[0].strip().lower() \
+                != "application/json":
+            self._reply(415, {"error": "request body must be application/json"})
+        else:
+            return False
+        return True
+
+    def do_GET(self):
+        if self._refuse(require_json=False):
+            return
+        if self.path == "/stats":
+            self._reply(200, self.server.cache.stats())
+        else:
+            self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        srv = self.server
+        if self._refuse(require_json=True):
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}", object_hook=decode_bytes)
+            if self.path == "/run":
+                self._reply(200, srv.run_argv(req["argv"], req.get("cwd") or os.getcwd()))
+            elif self.path == "/read":
+                effdir = srv.cache.get(req["input"])
+                self._reply(200, {k: v for k, v in effdir.items() if k != "_raw_bytes"})
+            elif self.path == "/query":
+                self._reply(200, srv.query(req))
+            elif self.path == "/isolate":
+                self._reply_data(srv.isolate(req), req.get("output"))
+            elif self.path == "/write":
+                self._reply_data(effdir_to_bytes(req["effdir"]), req.get("output"))
+            elif self.path == "/shutdown":
+                self._reply(200, {"ok": True})
+                threading.Thread(target=srv.shutdown, daemon=True).start()
+            else:
+                self._reply(404, {"error": f"unknown endpoint {self.path}"})
+        except (KeyError, ValueError, TypeError, IndexError, OSError, EOFError) as exc:
+            self._reply(400, {"error": f"{type(exc).__name__}: {exc}"})
+        except Exception as exc:
+            self._reply(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+def serve(host="127.0.0.1", port=8765, max_bytes=DEFAULT_MEMORY_BYTES):
+    """Run the server until /shutdown or Ctrl+C."""
+    server = EffdirServer((host, port), max_bytes)
+    print(f"Serving effdirs on http://{host}:{server.server_address[1]}", flush=True)
+    print(f"Token: {server.token}  (clients: set EFFDIR_SERVER_TOKEN or pass --server-token)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def _strip_server_option(argv):
+    out = []
+    skip = False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a in ("--server", "--server-token"):
+            skip = True
+        elif not a.startswith(("--server=", "--server-token=")):
+            out.append(a)
+    return out
+
+def forward(url, argv, token=None):
+    """
+    Thin client: run a main.py command line on the server at `url`, print
+    its output and return its exit code.
+    token: the token the server printed at startup.
+    """
+    if not token:
+        print("ERROR: no server token (set EFFDIR_SERVER_TOKEN or pass --server-token)", file=sys.stderr)
+        return 2
+    body = json.dumps({"argv": _strip_server_option(argv), "cwd": os.getcwd()}).encode("utf-8")
+    req = urllib.request.Request(url.rstrip("/") + "/run", data=body,
+                                 headers={"Content-Type": "application/json",
+                                          "Authorization": f"Bearer {token}"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            reply = json.load(resp)
+    except urllib.error.HTTPError as exc:
+        print(f"ERROR: effdir server at {url} refused the request: {exc.code} {exc.reason}", file=sys.stderr)
+        return 2
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        print(f"ERROR: cannot reach effdir server at {url}: {exc}", file=sys.stderr)
+        return 2
+    sys.stdout.write(reply.get("stdout", ""))
+    sys.stderr.write(reply.get("stderr", ""))
+    return reply.get("exit", 0)
@@ -0,0 +1,98 @@
+# effdir_spans.py
+# Source byte spans for parsed entries (read_effdir(..., spans=True)).
+# Each entry remembers the bytes it was decoded from; write_effdir copies
+# those bytes verbatim instead of re-encoding the entry, and coalesces runs
+# of consecutive unmodified entries into one slice copy.  Small edits to a
+# large directory then cost a few memcpys, and untouched entries stay
+# bit-exact (including float NaN payloads and string bytes that latin1
+# decoding dropped).
+# Dirty tracking: the entry dict and every dict / list nested in it are
+# tracked containers.  Any mutation through them (e["speed"] = 2.0,
+# e["prim_indx"][0]["indx_key"] = 5, e["reps"].append(1), ...) drops the
+# entry's span, and the writer encodes it from its fields again.  A copy
+# (e.copy(), copy.deepcopy, pickling) is a plain dict without a span.
+# Nested containers stay bound to the entry they were read with: a list
+# moved into another entry and then changed marks both entries dirty.
+# Curves (curves=True) live in a shared store outside the entries, so spans
+# cannot be combined with them.
+# Usage:
+#   eff = read_effdir("big.eff", spans=True)
+#   eff["sec"][2]["entry"][5]["speed"] = 2.0   # only this entry is encoded
+#   write_effdir(eff, "big_edited.eff")
+
+from functools import wraps
+
+from effdir_schema import LAYOUTS, make_reader
+
+class TrackedDict(dict):
+    """A dict nested in a span entry; mutating it makes the entry dirty."""
+    __slots__ = ("_root",)
+
+    def __reduce__(self):
+        # copies and pickles are plain, untracked dicts
+        return dict, (dict(self),)
+
+class SpanEntry(TrackedDict):
+    """
+    A parsed entry with its source bytes: span is (buf, start, end), or None
+    once the entry (or anything nested in it) has been modified.
+    """
+    __slots__ = ("span",)
+
+class TrackedList(list):
+    """A list nested in a span entry; mutating it makes the entry dirty."""
+    __slots__ = ("_root",)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+def _dirtying(cls, names):
+    base = cls.__mro__[1]
+    for name in names:
+        method = getattr(base, name)
+
+        @wraps(method)
+        def mutate(self, *args, _method=method, **kwargs):
+            self._root.span = None
+            return _method(self, *args, **kwargs)
+        setattr(cls, name, mutate)
+
+_dirtying(TrackedDict, ("__setitem__", "__delitem__", "__ior__", "clear", "pop", "popitem",
+                        "setdefault", "update"))
+_dirtying(TrackedList, ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend",
+                        "insert", "pop", "remove", "clear", "sort", "reverse"))
+
+def _entry():
+    e = SpanEntry()
+    e._root = e
+    return e
+
+def _finish(root, fields, buf, start, end):
+    dict.update(root, fields)
+    root.span = (buf, start, end)
+    return root
+
+def _list(root, values):
+    lst = TrackedList(values)
+    lst._root = root
+    return lst
+
+def _dict(root, d):
+    d = TrackedDict(d)
+    d._root = root
+    return d
+
+def _groups(root, values, width):
+    return _list(root, [_list(root, values[i:i + width]) for i in range(0, len(values), width)])
+
+# the effdir_schema layouts, decoded straight into tracked containers
+SPAN_READERS = {
+    nr: make_reader(layout, f"sec{nr}_span_entry",
+                    track={"entry": _entry, "finish": _finish, "list": _list, "dict": _dict,
+                           "groups": _groups})
+    for nr, layout in LAYOUTS.items()
+}
+
+def entry_span(e):
+    """(buf, start, end) of an unmodified span entry, else None."""
+    return e.span if type(e) is SpanEntry else None
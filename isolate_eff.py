@@ -1,12 +1,40 @@
 # isolate_eff.py
 # Translate of IsolateEff.m to Python, keeps logic and indexing
+from effdir_refs import INDX_FLAG_SECTIONS, prim_refs
+from write_effdir import effdir_to_bytes
+
+def _empty_effdir(effdir):
+    """New effdir with effdir's header, sec135 and eos values and no entries."""
+    neffdir = {"sec": {}}
+    neffdir["init"] = list(effdir.get("init", [0,0]))
+    if "sec135" in effdir:
+        neffdir["sec135"] = effdir["sec135"]
+
+    # set all sections n_entries=0 and copy eos if present
+    for i in range(1,16):
+        neffdir["sec"][i] = {"n_entries": 0}
+        if i in effdir["sec"] and "eos" in effdir["sec"][i]:
+            neffdir["sec"][i]["eos"] = effdir["sec"][i]["eos"]
+
+    # copy sec13 eos bytes
+    neffdir["sec"][13] = {}
+    neffdir["sec"][13]["eos1"] = effdir["sec"][13].get("eos1",0)
+    neffdir["sec"][13]["eos2"] = effdir["sec"][13].get("eos2",0)
+    neffdir["sec"][12] = {}
+    return neffdir
+
 def isolate_eff(effdir, index, unique_effect_name):
     """
     effdir: dict from read_effdir
     index: integer index into sec(13).entry (MATLAB style, 1-based)
     unique_effect_name: string
     Returns neffdir (new isolated effdir)
+    With a list / tuple / set of 1-based indices or sec13 names as `index`,
+    all of them are isolated into one effdir (see isolate_effects);
+    unique_effect_name is then None or a list of new names.
     """
+    if isinstance(index, (list, tuple, set, frozenset)):
+        return isolate_effects(effdir, index, unique_effect_name)
     # In MATLAB index likely 1-based; our Python translation preserves the same convention.
     # So index argument should be 1-based here.
     if "sec" not in effdir:
@@ -21,29 +49,18 @@ def isolate_eff(effdir, index, unique_effect_name):
     sec12_index_key = src_entry["index_key"] + 1  # MATLAB used +1 for indexing into sec(12).entry
 
     # initialize new effdir
-    neffdir = {"sec": {}}
-    neffdir["init"] = effdir.get("init", [0,0])
-    if "sec135" in effdir:
-        neffdir["sec135"] = effdir["sec135"]
-
-    # set all sections n_entries=0 and copy eos if present
-    for i in range(1,16):
-        neffdir["sec"][i] = {"n_entries": 0}
-        if i in effdir["sec"] and "eos" in effdir["sec"][i]:
-            neffdir["sec"][i]["eos"] = effdir["sec"][i]["eos"]
-
-    # copy sec13 eos bytes
-    neffdir["sec"][13] = {}
-    neffdir["sec"][13]["eos1"] = effdir["sec"][13].get("eos1",0)
-    neffdir["sec"][13]["eos2"] = effdir["sec"][13].get("eos2",0)
-    neffdir["sec"][12] = {}
+    neffdir = _empty_effdir(effdir)
 
     # new sec12 has 1 entry = the selected entry from original sec12
     sec12_entries = effdir["sec"][12]["entry"]
     if sec12_index_key - 1 < 0 or sec12_index_key - 1 >= len(sec12_entries):
         raise IndexError("sec12 index key out of range")
     neffdir["sec"][12]["n_entries"] = 1
-    neffdir["sec"][12]["entry"] = [sec12_entries[sec12_index_key-1].copy()]
+    new12 = sec12_entries[sec12_index_key-1].copy()
+    # prim_indx keys are rewritten below; copy them so the source effdir
+    # (possibly a cached, shared one) is never modified
+    new12["prim_indx"] = [p.copy() for p in new12["prim_indx"]]
+    neffdir["sec"][12]["entry"] = [new12]
 
     # sec13: new has the chosen entry as entry(1), and also the closing entry (original sec13 last)
     neffdir["sec"][13]["entry"] = []
@@ -64,11 +81,10 @@ def isolate_eff(effdir, index, unique_effect_name):
         sec_flag = prim_indx[i]["indx_flag"]
         sec_index_key = prim_indx[i]["indx_key"]
         # mapping from flags to section numbers (as in your MATLAB switch)
-        mapping = {0:1, 1:2, 3:4, 4:6, 5:7, 6:8, 7:9, 8:10, 10:11}
-        if sec_flag not in mapping:
+        if sec_flag not in INDX_FLAG_SECTIONS:
             # skip unknown/redirect flags
             continue
-        sec_nr = mapping[sec_flag]
+        sec_nr = INDX_FLAG_SECTIONS[sec_flag]
         # increment new section entry count and append the referenced entry (MATLAB used +1 shift)
         # original effdir sections are 1-based in MATLAB, Python lists are 0-based
         original_entries = effdir["sec"][sec_nr]["entry"]
@@ -87,6 +103,147 @@ def isolate_eff(effdir, index, unique_effect_name):
 
     return neffdir
 
+def isolate_effects(effdir, selectors, new_names=None):
+    """
+    Isolate several effects into one new effdir.
+    selectors: 1-based sec13 indices and / or exact sec13 names (a set is
+               taken in index order)
+    new_names: None to keep the effects' names, or one new name per selector
+    Every referenced entry is emitted once, however many of the selected
+    effects use it, and the prim_indx keys point at that one copy.  An effect
+    selected more than once (by index and by name, say) is isolated once;
+    giving it two different new names is an error.  Each selected effect
+    keeps its own sec12 entry, as sec13 needs exactly one per effect.
+    sec_indx keys into selected sec12 entries are remapped, others are kept
+    as IsolateEff.m keeps them.  One pass over the references.
+    """
+    if "sec" not in effdir:
+        raise ValueError("effdir missing 'sec'")
+    names = section13_names(effdir)
+    indices = [resolve_effect(effdir, sel, names) for sel in selectors]
+    if new_names is None:
+        new_names = [None] * len(indices)
+    elif len(new_names) != len(indices):
+        raise ValueError(f"{len(new_names)} new names for {len(indices)} effects")
+    chosen = {}     # index -> new name, first selection first
+    for index, new_name in zip(indices, new_names):
+        if index in chosen and chosen[index] != new_name:
+            raise ValueError(f"effect {index} selected twice with different names "
+                             f"({chosen[index]!r}, {new_name!r})")
+        chosen.setdefault(index, new_name)
+    pairs = list(chosen.items())
+    if isinstance(selectors, (set, frozenset)):
+        pairs.sort(key=lambda pair: pair[0])
+
+    sec13_entries = effdir["sec"][13]["entry"]
+    sec12_entries = effdir["sec"][12]["entry"]
+    new12 = {}      # old sec12 key -> new sec12 key (its first copy)
+    for pos, (index, _new_name) in enumerate(pairs):
+        if index < 1 or index > len(sec13_entries):
+            raise IndexError(f"index {index} out of range for sec13 entries")
+        key12 = sec13_entries[index-1]["index_key"]
+        if key12 < 0 or key12 >= len(sec12_entries):
+            raise IndexError(f"sec12 index key {key12} of effect {index} out of range")
+        new12.setdefault(key12, pos)
+
+    neffdir = _empty_effdir(effdir)
+    out = {nr: [] for nr in set(INDX_FLAG_SECTIONS.values())}
+    remap = {}      # (section, old key) -> new key
+    out12 = []
+    out13 = []
+    for index, new_name in pairs:
+        src_entry = sec13_entries[index-1]
+        e12 = sec12_entries[src_entry["index_key"]]
+        prim = []
+        for _slot, sec_nr, key, p in prim_refs(e12):
+            if sec_nr is None or key < 0 or key >= len(effdir["sec"][sec_nr]["entry"]):
+                # redirect / unknown flag or dangling key: kept as is
+                prim.append(p)
+                continue
+            new_key = remap.get((sec_nr, key))
+            if new_key is None:
+                # entries are shared with the source, never modified
+                new_key = remap[(sec_nr, key)] = len(out[sec_nr])
+                out[sec_nr].append(effdir["sec"][sec_nr]["entry"][key])
+            prim.append({**p, "indx_key": new_key})
+        sec = [{**s, "index_key": new12[s["index_key"]]} if s["index_key"] in new12 else s
+               for s in e12.get("sec_indx", [])]
+        new_entry = {**src_entry, "index_key": len(out12)}
+        out12.append({**e12, "prim_indx": prim, "sec_indx": sec})
+        if new_name is not None:
+            new_entry["str"] = new_name
+            new_entry["str_rep"] = len(new_name)
+        out13.append(new_entry)
+
+    for sec_nr, entries in out.items():
+        if entries:
+            neffdir["sec"][sec_nr]["n_entries"] = len(entries)
+            neffdir["sec"][sec_nr]["entry"] = entries
+    neffdir["sec"][12]["n_entries"] = len(out12)
+    neffdir["sec"][12]["entry"] = out12
+    # closing entry (original sec13 last)
+    neffdir["sec"][13]["entry"] = out13 + [sec13_entries[-1]]
+    return neffdir
+
+def section13_names(effdir):
+    """Map Section 13 effect names to their 1-based index (first occurrence wins)."""
+    entries = effdir["sec"][13]["entry"]
+    names = {}
+    # the last entry is the closing entry, not an effect
+    for i, e in enumerate(entries[:-1], start=1):
+        names.setdefault(e.get("str", ""), i)
+    return names
+
+def resolve_effect(effdir, selector, names=None):
+    """1-based Section 13 index for an int index or an exact effect name."""
+    if isinstance(selector, int):
+        return selector
+    if names is None:
+        names = section13_names(effdir)
+    if selector not in names:
+        raise KeyError(f"no effect named {selector!r} in sec13")
+    return names[selector]
+
+def _write_isolated(job):
+    neffdir, output = job
+    data = effdir_to_bytes(neffdir)
+    with open(output, "wb") as f:
+        f.write(data)
+    return len(data)
+
+def isolate_many(effdir, selections, processes=None):
+    """
+    effdir: dict from read_effdir (parsed once, shared by every selection)
+    selections: iterable of (index_or_name, output_path) or
+                (index_or_name, output_path, unique_effect_name); indices are
+                1-based like isolate_eff, names match sec13 'str' exactly and
+                the new effect keeps the original name unless one is given
+    processes: serialize the isolated effdirs on a process pool of this size
+    Returns one {"index", "name", "output", "bytes"} dict per selection.
+    """
+    names = section13_names(effdir)
+    sec13_entries = effdir["sec"][13]["entry"]
+    jobs = []
+    results = []
+    for sel in selections:
+        selector, output = sel[0], sel[1]
+        index = resolve_effect(effdir, selector, names)
+        if index < 1 or index > len(sec13_entries):
+            raise IndexError(f"index {index} out of range for sec13 entries")
+        new_name = sel[2] if len(sel) > 2 else sec13_entries[index-1].get("str", "")
+        jobs.append((isolate_eff(effdir, index, new_name), output))
+        results.append({"index": index, "name": new_name, "output": output})
+
+    if processes and processes > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            sizes = list(pool.map(_write_isolated, jobs))
+    else:
+        sizes = [_write_isolated(job) for job in jobs]
+    for res, size in zip(results, sizes):
+        res["bytes"] = size
+    return results
+
 # quick test usage when run directly
 if __name__ == "__main__":
     import sys
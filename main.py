@@ -1,83 +1,82 @@
-import argparse
-import json
-import sys
-import traceback
-import struct
-
-def main():
-    print("Effect Dir Editor v1.0 starting...")
-    # This just ensures the build runs correctly.
-    # Later we’ll connect this to read_effdir, write_effdir, and isolate_eff.
-    print("Build successful. Ready for EffDir operations.")
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Effect Dir Editor v1.0")
-    args = parser.parse_args()
-    main()
-    
 # main.py
 """
 CLI entrypoint for EffDirEditor (minimal, robust).
 Usage examples:
     python main.py read input.effdir
+    python main.py read input.effdir --format ndjson --sections 13 | jq .entry.str
+    python main.py query input.effdir --section 13 --fields str index_key
     python main.py isolate input.effdir output.effdir --index 5 --name farmhorses
+    python main.py isolate input.effdir output.effdir --name-match "farmhorse*" --name farmhorses
+    python main.py isolate input.effdir plugin.effdir --effects 5 7 farmhorses
+    python main.py find input.effdir "farm*"
     python main.py write input.json output.effdir
+    python main.py export input.effdir tables.npz --sections 12 13
+    python main.py patch input.effdir --set 14:3:group_prop=7 --set 2:0:speed=1.5
+    python main.py merge all.effdir a.effdir b.effdir --on-collision rename
+    python main.py dedupe all.effdir all_small.effdir --sections 1 2 6 8
+    python main.py isolate-many input.effdir 5=five.effdir farmhorses=farm.effdir --jobs 4
+    python main.py batch jobs.json --jobs 8 --report report.json
+    python main.py serve --port 8765                                   # resident server
+    python main.py --server http://127.0.0.1:8765 --server-token TOKEN read input.effdir  # thin client
 """
 
-from read_effdir import read_effdir
-from write_effdir import write_effdir
-from isolate_eff import isolate_eff
+import json
+import multiprocessing
+import os
+import sys
+import traceback
+
+from effdir_cli import build_parser, format_json, run_command, write_read
 
 def safe_print_json(obj):
-    try:
-        print(json.dumps(obj, indent=2, ensure_ascii=False))
-    except Exception:
-        # fallback: print repr
-        print(repr(obj))
+    print(format_json(obj))
 
 def main():
-    parser = argparse.ArgumentParser(description="EffDirEditor (minimal)")
-    sub = parser.add_subparsers(dest="cmd", required=True)
-
-    r = sub.add_parser("read", help="Read an EffDir file")
-    r.add_argument("input", help="Input .effdir file")
+    argv = sys.argv[1:]
+    args = build_parser().parse_args(argv)
 
-    w = sub.add_parser("write", help="Write effdir from a JSON file (minimal)")
-    w.add_argument("input", help="Input JSON file")
-    w.add_argument("output", help="Output .effdir file")
+    if args.cmd == "serve":
+        from effdir_server import serve
+        serve(args.host, args.port, max_bytes=args.max_mb << 20)
+        return
 
-    iso = sub.add_parser("isolate", help="Isolate an effect (minimal)")
-    iso.add_argument("input", help="Input .effdir file")
-    iso.add_argument("output", help="Output .effdir file")
-    iso.add_argument("--index", type=int, required=True)
-    iso.add_argument("--name", type=str, required=True)
+    if args.cmd == "batch":
+        from effdir_batch import load_jobs, run_batch
+        try:
+            jobs = load_jobs(args.input)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(2)
+        report = run_batch(jobs, os.path.dirname(os.path.abspath(args.input)),
+                           processes=args.jobs, disk_cache=not args.no_cache)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        else:
+            safe_print_json(report)
+        # 1: some jobs failed (see the report)
+        sys.exit(1 if report["failed"] else 0)
 
-    args = parser.parse_args()
+    if args.server:
+        from effdir_server import forward
+        sys.exit(forward(args.server, argv, args.server_token))
 
     try:
         if args.cmd == "read":
-            info = read_effdir(args.input)
-            # remove raw bytes from printing to keep logs small
-            info_no_raw = {k: v for k, v in info.items() if k != "_raw_bytes"}
-            safe_print_json(info_no_raw)
-
-        elif args.cmd == "write":
-            with open(args.input, "r", encoding="utf-8") as jf:
-                data = json.load(jf)
-            res = write_effdir(data, args.output)
-            safe_print_json(res)
-
-        elif args.cmd == "isolate":
-            eff = read_effdir(args.input)
-            ne = isolate_eff(eff, args.index, args.name)
-            res = write_effdir(ne, args.output)
-            safe_print_json(res)
-
-    except Exception as e:
+            write_read(args)
+        else:
+            safe_print_json(run_command(args))
+    except BrokenPipeError:
+        # output piped into head / jq that exited early; keep the interpreter
+        # from failing again while flushing stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except Exception:
         print("ERROR during command execution:", file=sys.stderr)
         traceback.print_exc()
         sys.exit(2)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # process pools inside the PyInstaller exe
     main()
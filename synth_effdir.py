@@ -0,0 +1,175 @@
+# synth_effdir.py
+# Synthetic effdir generator for benchmarks.
+# Emits structurally valid files of configurable size: entries per section,
+# curve lengths (reps per over-time list), string lengths and the Section 12
+# prim_indx fan-out.  Entries are random dicts built from the section
+# layouts (effdir_schema.LAYOUTS) and encoded with their codecs, so the
+# generator follows any layout change.  References are kept consistent:
+# prim_indx keys point at existing entries of the section their indx_flag
+# selects, sec_indx and Section 13 keys at existing Section 12 entries.
+# Output is deterministic for a given seed.
+# Usage:
+#   python synth_effdir.py out.effdir --entries 2000 --curve-len 16
+#   data = generate_effdir(entries={1: 500, 12: 100}, fanout=8)
+
+import argparse
+import random
+import struct
+
+from effdir_refs import INDX_FLAG_SECTIONS
+from effdir_schema import CODECS, LAYOUTS, SEC12_PRIM, SEC12_SEC, SEC135, SEC135_CODEC, Array, Field, Raw, String
+from effdir_schema import SECTIONS as _LAYOUT_SECTIONS
+
+SECTIONS = tuple(s.nr for s in _LAYOUT_SECTIONS)
+# sections followed by a uint16 end-of-section marker
+_EOS_SECTIONS = tuple(s.nr for s in _LAYOUT_SECTIONS if s.eos is not None)
+_NAME_CHARS = "abcdefghijklmnopqrstuvwxyz_"
+# Section 1 end-of-entry marker (float 4.0)
+_SEC1_END_MARKER = 0x40800000
+
+class _Gen:
+    """Random entry generator bound to one random.Random."""
+
+    def __init__(self, seed, curve_len, str_len):
+        self.r = random.Random(seed)
+        self.curve_len = curve_len
+        self.str_len = str_len
+
+    def floats(self, n):
+        r = self.r
+        return [r.uniform(-8.0, 8.0) for _ in range(n)]
+
+    def dwords(self, n):
+        getrandbits = self.r.getrandbits
+        return [getrandbits(32) for _ in range(n)]
+
+    def name(self, prefix=""):
+        r = self.r
+        fill = max(0, self.str_len - len(prefix))
+        return prefix + "".join(r.choice(_NAME_CHARS) for _ in range(fill))
+
+    def field(self, f):
+        r = self.r
+        if f.kind == "list":
+            return self.dwords(f.width)
+        if f.code == "f":
+            return r.uniform(-8.0, 8.0)
+        if f.code == "b":
+            return r.randint(-128, 127)
+        # "B" / "H" / "I" and the n-byte "ns" ints
+        return r.getrandbits(8 * struct.calcsize("<" + f.code))
+
+    def array(self, item):
+        """The entry fields of one counted array; lengths vary around curve_len."""
+        n = self.r.randint(0, 2 * self.curve_len)
+        w = item.width
+        vals = self.floats(w * n) if item.code == "f" else self.dwords(w * n)
+        if w == 1:
+            return {item.name: vals}
+        if item.split:
+            return {k: vals[j::w] for j, k in enumerate(item.split)}
+        if item.columns:
+            return {item.name: {k: vals[j::w] for j, k in enumerate(item.columns)}}
+        return {item.name: [item.rows(vals[i:i + w]) for i in range(0, w * n, w)]}
+
+    def entry(self, items):
+        """Random entry dict of a layout (effdir_schema)."""
+        e = {}
+        for item in items:
+            if isinstance(item, Field):
+                e[item.name] = self.field(item)
+            elif isinstance(item, Raw):
+                e[item.name] = self.r.randbytes(item.size)
+            elif isinstance(item, Array):
+                e.update(self.array(item))
+            elif isinstance(item, String):
+                e[item.name] = self.name()
+            else:
+                e[item.name] = [self.entry(item.items) for _ in range(self.r.randint(0, 3))]
+        return e
+
+def _packed(codec, e):
+    buf = bytearray(codec.size(e))
+    codec.pack(buf, 0, e)
+    return buf
+
+def _sec12_entry(g, counts, fanout):
+    r = g.r
+    flags = [f for f, nr in INDX_FLAG_SECTIONS.items() if counts[nr]]
+    e = g.entry(LAYOUTS[12])
+    e["prim_indx"] = []
+    for _ in range(r.randint(0, 2 * fanout)):
+        p = g.entry(SEC12_PRIM)
+        if flags:
+            p["indx_flag"] = r.choice(flags)
+            p["indx_key"] = r.randrange(counts[INDX_FLAG_SECTIONS[p["indx_flag"]]])
+        else:
+            p["indx_flag"], p["indx_key"] = 2, 0  # redirect flag, references nothing
+        e["prim_indx"].append(p)
+    e["sec_indx"] = []
+    for _ in range(r.randint(0, 2) if counts[12] else 0):
+        s = g.entry(SEC12_SEC)
+        s["index_key"] = r.randrange(counts[12])
+        e["sec_indx"].append(s)
+    return e
+
+def generate_effdir(entries=100, curve_len=8, str_len=12, fanout=4, seed=0):
+    """
+    Build one synthetic effdir and return its bytes.
+    entries:   entries per section, an int for all sections or a
+               {section: count} dict (missing sections get 0).  Section 13
+               always has one effect per Section 12 entry plus the closing entry.
+    curve_len: mean number of reps in the over-time lists.
+    str_len:   length of every string (Section 13 names get a unique prefix).
+    fanout:    mean number of prim_indx entries per Section 12 entry.
+    """
+    if isinstance(entries, int):
+        counts = dict.fromkeys(SECTIONS, entries)
+    else:
+        counts = {nr: entries.get(nr, 0) for nr in SECTIONS}
+    g = _Gen(seed, curve_len, str_len)
+    out = [struct.pack("<2H", 1, 2)]
+    for nr in SECTIONS:
+        if nr == 14:
+            # Section 13 (sec12 count + 1 entries, no count) and the 13.5 block
+            sec13 = CODECS[13]
+            for i in range(counts[12]):
+                out.append(_packed(sec13, {"str": g.name(f"fx{i}_"), "index_key": i}))
+            out += [_packed(sec13, {"str": g.name("end"), "index_key": 0}), struct.pack("<2B", 0, 1)]
+            out.append(_packed(SEC135_CODEC, {**g.entry(SEC135), "u1": -1, "u2": 0}))
+        out.append(struct.pack("<I", counts[nr]))
+        codec = CODECS[nr]
+        for _ in range(counts[nr]):
+            if nr == 12:
+                e = _sec12_entry(g, counts, fanout)
+            else:
+                e = g.entry(LAYOUTS[nr])
+                if nr == 1:
+                    e["entry_end_marker"] = _SEC1_END_MARKER
+            out.append(_packed(codec, e))
+        if nr in _EOS_SECTIONS:
+            out.append(struct.pack("<H", 0))
+    return b"".join(out)
+
+def write_synthetic(filename, **kwargs):
+    """generate_effdir(**kwargs) written to `filename`; returns the byte count."""
+    data = generate_effdir(**kwargs)
+    with open(filename, "wb") as f:
+        f.write(data)
+    return len(data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic .effdir file")
+    parser.add_argument("output", help="Output .effdir file")
+    parser.add_argument("--entries", type=int, default=100, help="Entries per section")
+    parser.add_argument("--curve-len", type=int, default=8, help="Mean reps per over-time list")
+    parser.add_argument("--str-len", type=int, default=12, help="String length")
+    parser.add_argument("--fanout", type=int, default=4, help="Mean prim_indx entries per Section 12 entry")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    size = write_synthetic(args.output, entries=args.entries, curve_len=args.curve_len,
+                           str_len=args.str_len, fanout=args.fanout, seed=args.seed)
+    print(f"Wrote {size} bytes to {args.output}")
+
+if __name__ == "__main__":
+    main()
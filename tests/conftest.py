@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synth_effdir import write_synthetic
+
+@pytest.fixture
+def effdir_file(tmp_path):
+    """A small synthetic .effdir with consistent references."""
+    path = str(tmp_path / "in.effdir")
+    write_synthetic(path, entries=20, curve_len=4, str_len=8, fanout=4, seed=1)
+    return path
+
+@pytest.fixture
+def other_effdir_file(tmp_path):
+    """A second, differently sized synthetic .effdir."""
+    path = str(tmp_path / "other.effdir")
+    write_synthetic(path, entries=12, curve_len=3, str_len=6, fanout=3, seed=2)
+    return path
@@ -0,0 +1,53 @@
+import os
+import shutil
+
+import effdir_batch
+from effdir_batch import run_batch
+from effdir_merge import merge_effdirs
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+_run_group = effdir_batch._run_group
+
+def _crash_on_marked_input(items, disk_cache=True):
+    if items[0][1].input.endswith("crash.effdir"):
+        os._exit(1)
+    return _run_group(items, disk_cache)
+
+def test_batch_reports_jobs_of_a_dead_worker(effdir_file, tmp_path, monkeypatch):
+    crash = tmp_path / "crash.effdir"
+    shutil.copy(effdir_file, crash)
+    # forked workers inherit the patched module attribute
+    monkeypatch.setattr(effdir_batch, "_run_group", _crash_on_marked_input)
+    jobs = [{"cmd": "query", "input": str(path), "section": 13, "index": 0}
+            for path in (effdir_file, crash)]
+    report = run_batch(jobs, processes=2)
+    assert [rec["job"] for rec in report["jobs"]] == [0, 1]
+    assert not report["jobs"][1]["ok"]
+    assert report["jobs"][1]["error"].startswith("BrokenProcessPool")
+
+def test_batch_runs_jobs_after_the_jobs_writing_their_inputs(effdir_file, tmp_path):
+    fx1, fx2, merged = (str(tmp_path / name) for name in ("fx1.effdir", "fx2.effdir", "merged.effdir"))
+    jobs = [
+        {"cmd": "isolate", "input": effdir_file, "output": fx1, "index": 1, "name": "one"},
+        {"cmd": "isolate", "input": effdir_file, "output": fx2, "index": 2, "name": "two"},
+        {"cmd": "merge", "output": merged, "inputs": [fx1, fx2]},
+        {"cmd": "find", "input": merged, "pattern": "*"},
+    ]
+    report = run_batch(jobs, processes=3)
+    assert [rec["ok"] for rec in report["jobs"]] == [True] * 4, report
+    expected, _ = merge_effdirs([read_effdir(fx1), read_effdir(fx2)])
+    assert open(merged, "rb").read() == effdir_to_bytes(expected)
+    assert [m["name"] for m in report["jobs"][3]["result"]] == ["one", "two"]
+
+def test_batch_job_writing_its_input_drops_the_shared_parse(effdir_file, tmp_path):
+    path = str(tmp_path / "work.effdir")
+    shutil.copy(effdir_file, path)
+    jobs = [
+        {"cmd": "query", "input": path, "section": 12},
+        {"cmd": "isolate", "input": path, "output": path, "index": 2, "name": "only"},
+        {"cmd": "query", "input": path, "section": 13, "fields": ["str"]},
+    ]
+    report = run_batch(jobs, processes=1)
+    assert [e["entry"]["str"] for e in report["jobs"][2]["result"]][0] == "only"
+    assert len(report["jobs"][2]["result"]) == 2
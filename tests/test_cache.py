@@ -0,0 +1,80 @@
+import os
+import pickle
+import warnings
+
+import pytest
+
+from effdir_cache import CACHE_VERSION, cached_read_effdir, snapshot_path
+from read_effdir import read_effdir
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX owner / mode checks")
+
+class _Payload:
+    """Unpickling this creates `marker`."""
+
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return (open, (self.marker, "w"))
+
+def _plant(effdir_file, cache_dir, marker):
+    # a snapshot whose header matches the source, followed by a payload
+    st = os.stat(effdir_file)
+    header = {"version": CACHE_VERSION, "path": os.path.abspath(effdir_file), "size": st.st_size,
+              "mtime_ns": st.st_mtime_ns, "hash": ""}
+    path = snapshot_path(effdir_file, str(cache_dir))
+    with open(path, "wb") as f:
+        pickle.dump(header, f)
+        pickle.dump(_Payload(str(marker)), f)
+    return path
+
+def test_snapshot_round_trip(effdir_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    first = cached_read_effdir(effdir_file, str(cache_dir))
+    path = snapshot_path(effdir_file, str(cache_dir))
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    assert os.stat(cache_dir).st_mode & 0o077 == 0
+    assert cached_read_effdir(effdir_file, str(cache_dir)) == first == read_effdir(effdir_file)
+
+@pytest.mark.parametrize("tamper", ["group_writable_dir", "world_writable_snapshot", "foreign_owner"])
+def test_untrusted_snapshot_is_not_unpickled(effdir_file, tmp_path, tamper):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o700)
+    marker = tmp_path / "pwned"
+    path = _plant(effdir_file, cache_dir, marker)
+    os.chmod(path, 0o600)
+    if tamper == "group_writable_dir":
+        os.chmod(cache_dir, 0o770)
+    elif tamper == "world_writable_snapshot":
+        os.chmod(path, 0o602)
+    else:
+        if os.getuid() != 0:
+            pytest.skip("changing the owner needs root")
+        os.chown(path, os.getuid() + 1, -1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        effdir = cached_read_effdir(effdir_file, str(cache_dir))
+    assert not marker.exists()
+    assert effdir == read_effdir(effdir_file)
+
+def test_untrusted_dir_is_not_written(effdir_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o700)
+    os.chmod(cache_dir, 0o777)
+    with pytest.warns(RuntimeWarning, match="writable by another user"):
+        assert cached_read_effdir(effdir_file, str(cache_dir)) == read_effdir(effdir_file)
+    # once per directory
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        cached_read_effdir(effdir_file, str(cache_dir))
+    assert os.listdir(cache_dir) == []
+
+def test_trusted_snapshot_is_loaded(effdir_file, tmp_path):
+    # control for the test above: the planted snapshot is reached when trusted
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o700)
+    marker = tmp_path / "pwned"
+    os.chmod(_plant(effdir_file, cache_dir, marker), 0o600)
+    cached_read_effdir(effdir_file, str(cache_dir))
+    assert marker.exists()
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from effdir_columnar import records_to_dicts
+from effdir_merge import merge_effdirs
+from isolate_eff import isolate_eff
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+def test_records_to_dicts_matches_plain_entries(effdir_file):
+    plain = read_effdir(effdir_file)
+    columnar = read_effdir(effdir_file, columnar=True)
+    for nr in (5, 7, 9, 10):
+        assert records_to_dicts(columnar["sec"][nr]["entry"]) == plain["sec"][nr]["entry"]
+    # raw bytes fields come back as bytes, from single rows too
+    assert records_to_dicts([columnar["sec"][7]["entry"][0]])[0]["u1_raw"] == plain["sec"][7]["entry"][0]["u1_raw"]
+
+def test_isolate_columnar_effdir(effdir_file):
+    plain = effdir_to_bytes(isolate_eff(read_effdir(effdir_file), [1, 3], None))
+    columnar = effdir_to_bytes(isolate_eff(read_effdir(effdir_file, columnar=True), [1, 3], None))
+    assert columnar == plain
+
+def test_merge_columnar_effdirs(effdir_file):
+    plain, _ = merge_effdirs([read_effdir(effdir_file)] * 2, "rename")
+    columnar, _ = merge_effdirs([read_effdir(effdir_file, columnar=True)] * 2, "rename")
+    assert effdir_to_bytes(columnar) == effdir_to_bytes(plain)
@@ -0,0 +1,56 @@
+import pytest
+
+from effdir_dedupe import dedupe_effdir, dedupe_file
+from effdir_merge import merge_files
+from effdir_refs import INDX_FLAG_SECTIONS
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+def _targets(effdir):
+    """Every prim_indx reference replaced by the entry it points at."""
+    sec = effdir["sec"]
+    out = []
+    for e12 in sec[12]["entry"]:
+        for p in e12["prim_indx"]:
+            nr = INDX_FLAG_SECTIONS.get(p["indx_flag"])
+            out.append(sec[nr]["entry"][p["indx_key"]] if nr else p["indx_key"])
+    return out
+
+@pytest.fixture
+def doubled_file(effdir_file, tmp_path):
+    # the same input twice: every entry of Sections 1-11 has a copy
+    path = str(tmp_path / "doubled.effdir")
+    merge_files([effdir_file, effdir_file], path, on_collision="keep")
+    return path
+
+def test_dedupe_remaps_references(effdir_file, doubled_file, tmp_path):
+    single, doubled = read_effdir(effdir_file), read_effdir(doubled_file)
+    out = str(tmp_path / "deduped.effdir")
+    report = dedupe_file(doubled_file, out)
+    # the written file is what a full read -> dedupe -> write gives
+    assert open(out, "rb").read() == effdir_to_bytes(dedupe_effdir(doubled)[0])
+    deduped = read_effdir(out)
+    for nr in (1, 2, 6, 8):
+        unique = []
+        for e in single["sec"][nr]["entry"]:
+            if e not in unique:
+                unique.append(e)
+        assert deduped["sec"][nr]["entry"] == unique
+        assert report["sections"][nr]["removed"] == len(doubled["sec"][nr]["entry"]) - len(unique)
+    assert report["removed"] > 0
+    assert report["bytes_after"] == report["bytes_before"] - report["bytes_saved"]
+    # every reference still resolves to an identical entry
+    assert _targets(deduped) == _targets(doubled)
+    for nr in (3, 4, 5, 7, 9, 10, 11, 13, 14, 15):
+        assert deduped["sec"][nr] == doubled["sec"][nr]
+
+def test_dedupe_in_place_and_sections(doubled_file):
+    doubled = read_effdir(doubled_file)
+    expected = effdir_to_bytes(dedupe_effdir(doubled, sections=(2,))[0])
+    dedupe_file(doubled_file, doubled_file, sections=(2,))
+    assert open(doubled_file, "rb").read() == expected
+    deduped = read_effdir(doubled_file)
+    assert deduped["sec"][1] == doubled["sec"][1]
+    assert _targets(deduped) == _targets(doubled)
+    with pytest.raises(ValueError, match="cannot be deduplicated"):
+        dedupe_effdir(doubled, sections=(12,))
@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from effdir_export import export_columnar, load_export
+from read_effdir import read_effdir
+
+def _children(columns, path):
+    prefix = path + "/"
+    return [k[len(prefix):] for k in columns if k.startswith(prefix) and not any(c in k[len(prefix):] for c in "/[")]
+
+def _values(ex, path, rows):
+    """The values of column `path` at the element positions `rows`, rebuilt as read_effdir gives them."""
+    kind = ex.schema["columns"].get(path, "struct")
+    if kind in ("int", "float"):
+        return ex[path][rows].tolist()
+    if kind == "str":
+        return [ex.string(i) for i in ex[path][rows].tolist()]
+    if kind == "bytes":
+        return [ex.ragged(path, r).tobytes() for r in rows]
+    if kind == "list":
+        offsets = ex[path + ".offsets"]
+        spans = [(int(offsets[r]), int(offsets[r + 1])) for r in rows]
+        flat = iter(_values(ex, path + "[]", [k for lo, hi in spans for k in range(lo, hi)]))
+        return [[next(flat) for _ in range(hi - lo)] for lo, hi in spans]
+    if kind == "empty":
+        return [None] * len(rows)
+    fields = {key: _values(ex, f"{path}/{key}", rows) for key in _children(ex.schema["columns"], path)}
+    return [{key: column[k] for key, column in fields.items()} for k in range(len(rows))]
+
+def _lists(value):
+    # tuples (curve points) come back as lists
+    if isinstance(value, (list, tuple)):
+        return [_lists(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _lists(v) for k, v in value.items()}
+    return value
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_export_round_trip(effdir_file, tmp_path, use_mmap):
+    out = str(tmp_path / "tables.npz")
+    report = export_columnar(effdir_file, out)
+    effdir = read_effdir(effdir_file)
+    ex = load_export(out, use_mmap=use_mmap)
+    assert report["tables"] == len(effdir["sec"]) == len(ex.schema["tables"])
+    assert ex.schema["init"] == effdir["init"]
+    assert ex.schema["sec135"] == effdir["sec135"]
+    for nr, sec in effdir["sec"].items():
+        table = ex.schema["tables"][f"sec{nr}"]
+        assert table["rows"] == len(sec["entry"])
+        assert {k: v for k, v in table.items() if k != "rows"} == {k: v for k, v in sec.items()
+                                                                  if k not in ("entry", "n_entries")}
+        assert _values(ex, f"sec{nr}", list(range(table["rows"]))) == _lists(sec["entry"])
+
+def test_export_sections_and_np_load(effdir_file, tmp_path):
+    out = str(tmp_path / "tables.npz")
+    export_columnar(effdir_file, out, sections=[12, 13])
+    effdir = read_effdir(effdir_file)
+    ex = load_export(out)
+    assert sorted(ex.schema["tables"]) == ["sec12", "sec13"]
+    assert ex.strings("sec13/str") == [e["str"] for e in effdir["sec"][13]["entry"]]
+    keys = [p["indx_key"] for e in effdir["sec"][12]["entry"] for p in e["prim_indx"]]
+    with np.load(out) as npz:
+        assert npz["sec12/prim_indx[]/indx_key"].tolist() == keys
+        assert np.array_equal(npz["sec12/prim_indx[]/indx_key"], ex["sec12/prim_indx[]/indx_key"])
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from effdir_index import build_index, index_path, load_index, read_entry
+from read_effdir import parse_effdir
+from synth_effdir import generate_effdir
+
+@pytest.fixture
+def sparse_file(tmp_path):
+    path = str(tmp_path / "sparse.effdir")
+    with open(path, "wb") as f:
+        f.write(generate_effdir(entries={1: 3, 12: 5, 14: 2}, curve_len=0, str_len=0, fanout=2, seed=2))
+    return path
+
+@pytest.mark.parametrize("name", ["effdir_file", "sparse_file"])
+def test_read_entry_matches_parse(request, name):
+    filename = request.getfixturevalue(name)
+    with open(filename, "rb") as f:
+        full = parse_effdir(f.read())
+    index = load_index(filename)
+    for nr, sec in full["sec"].items():
+        for i, e in enumerate(sec["entry"]):
+            assert read_entry(filename, nr, i, index) == e
+        with pytest.raises(IndexError):
+            read_entry(filename, nr, len(sec["entry"]), index)
+    # the sidecar was written and describes the file
+    assert os.path.exists(index_path(filename))
+    assert load_index(filename)["sections"] == build_index(filename)["sections"]
+
+def test_stale_sidecar_is_rebuilt(effdir_file, other_effdir_file):
+    load_index(effdir_file)
+    with open(other_effdir_file, "rb") as f:
+        data = f.read()
+    with open(effdir_file, "wb") as f:
+        f.write(data)
+    full = parse_effdir(data)
+    # a different size invalidates the sidecar
+    for i, e in enumerate(full["sec"][13]["entry"]):
+        assert read_entry(effdir_file, 13, i) == e
+    st = os.stat(effdir_file)
+    # same content, new mtime: confirmed by the hash and kept
+    os.utime(effdir_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_index(effdir_file)["sections"] == build_index(effdir_file)["sections"]
+    assert load_index(effdir_file)["mtime_ns"] == st.st_mtime_ns + 10**9
@@ -0,0 +1,41 @@
+import pytest
+
+from isolate_eff import isolate_eff
+from read_effdir import parse_effdir, read_effdir
+from write_effdir import effdir_to_bytes
+
+def _round_trip(effdir):
+    return parse_effdir(bytes(effdir_to_bytes(effdir)))
+
+def _names(effdir):
+    return [e["str"] for e in effdir["sec"][13]["entry"]]
+
+def test_isolate_effects_skips_repeated_selections(effdir_file):
+    src = read_effdir(effdir_file)
+    name5 = src["sec"][13]["entry"][4]["str"]
+    for selectors in ([1, 5, 5], [1, 5, name5]):
+        out = _round_trip(isolate_eff(src, selectors, None))
+        assert len(out["sec"][12]["entry"]) == 2
+        assert _names(out)[:2] == [src["sec"][13]["entry"][0]["str"], name5]
+        # the closing entry survives
+        assert out["sec"][13]["entry"][-1] == src["sec"][13]["entry"][-1]
+
+def test_isolate_effects_rejects_conflicting_names(effdir_file):
+    src = read_effdir(effdir_file)
+    with pytest.raises(ValueError):
+        isolate_eff(src, [5, 5], ["a", "b"])
+
+def test_isolate_effects_shared_sec12_entry(effdir_file):
+    src = read_effdir(effdir_file)
+    # two effects naming the same sec12 entry each get their own copy
+    src["sec"][13]["entry"][1]["index_key"] = src["sec"][13]["entry"][0]["index_key"]
+    out = _round_trip(isolate_eff(src, [1, 2], None))
+    assert len(out["sec"][12]["entry"]) == 2
+    assert [e["index_key"] for e in out["sec"][13]["entry"][:2]] == [0, 1]
+    assert out["sec"][13]["entry"][-1] == src["sec"][13]["entry"][-1]
+
+def test_single_selection_matches_isolate_eff(effdir_file):
+    src = read_effdir(effdir_file)
+    one = isolate_eff(src, 3, "x")
+    many = isolate_eff(src, [3], ["x"])
+    assert effdir_to_bytes(one) == effdir_to_bytes(many)
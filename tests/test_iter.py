@@ -0,0 +1,20 @@
+import pytest
+
+from effdir_index import load_index
+from read_effdir import iter_entries, parse_effdir
+
+def _flatten(full, sections):
+    return [(nr, i, e) for nr, sec in full["sec"].items() if nr in sections for i, e in enumerate(sec["entry"])]
+
+@pytest.mark.parametrize("sections", [None, (13,), (1, 12), (15,), (12, 14)])
+@pytest.mark.parametrize("indexed", [False, True])
+def test_iter_entries_matches_parse(effdir_file, sections, indexed):
+    with open(effdir_file, "rb") as f:
+        full = parse_effdir(f.read())
+    index = load_index(effdir_file) if indexed else None
+    wanted = full["sec"] if sections is None else sections
+    assert list(iter_entries(effdir_file, sections, index)) == _flatten(full, wanted)
+
+def test_iter_entries_rejects_unknown_section(effdir_file):
+    with pytest.raises(ValueError, match="Unknown section"):
+        list(iter_entries(effdir_file, (16,)))
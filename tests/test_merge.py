@@ -0,0 +1,79 @@
+import pytest
+
+import effdir_merge
+from effdir_merge import merge_effdirs, merge_files
+from effdir_refs import INDX_FLAG_SECTIONS
+from read_effdir import parse_effdir, read_effdir
+from write_effdir import effdir_to_bytes
+
+def _without(d, key):
+    return {k: v for k, v in d.items() if k != key}
+
+def _effect(effdir, i):
+    """Effect i with every key replaced by the entry it points at."""
+    sec = effdir["sec"]
+    e13 = sec[13]["entry"][i]
+    e12 = sec[12]["entry"][e13["index_key"]]
+    prim = []
+    for p in e12["prim_indx"]:
+        nr = INDX_FLAG_SECTIONS.get(p["indx_flag"])
+        prim.append((_without(p, "indx_key"), sec[nr]["entry"][p["indx_key"]] if nr else p["indx_key"]))
+    secondary = [(_without(s, "index_key"), _plain12(sec[12]["entry"][s["index_key"]])) for s in e12["sec_indx"]]
+    return e13["str"], _plain12(e12), prim, secondary
+
+def _plain12(e12):
+    # a sec12 entry without its keys
+    return _without(_without(e12, "prim_indx"), "sec_indx")
+
+def _n_effects(effdir):
+    return len(effdir["sec"][12]["entry"])
+
+def test_merge_remaps_every_key(effdir_file, other_effdir_file, tmp_path):
+    a, b = read_effdir(effdir_file), read_effdir(other_effdir_file)
+    out = str(tmp_path / "merged.effdir")
+    report = merge_files([effdir_file, other_effdir_file], out)
+    assert report["effects"] == _n_effects(a) + _n_effects(b)
+    merged = read_effdir(out)
+    # the written file is what a full read -> merge -> write gives
+    assert open(out, "rb").read() == effdir_to_bytes(merge_effdirs([a, b])[0])
+    for nr in (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 14, 15):
+        assert merged["sec"][nr]["entry"] == a["sec"][nr]["entry"] + b["sec"][nr]["entry"]
+    n = _n_effects(a)
+    assert any(e["sec_indx"] for e in b["sec"][12]["entry"])
+    for i in range(n):
+        assert _effect(merged, i) == _effect(a, i)
+    for i in range(_n_effects(b)):
+        assert _effect(merged, n + i) == _effect(b, i)
+    # one closing entry, the first input's
+    assert merged["sec"][13]["entry"][-1] == a["sec"][13]["entry"][-1]
+
+def test_merge_collision_modes(effdir_file):
+    a = read_effdir(effdir_file)
+    names = [e["str"] for e in a["sec"][13]["entry"][:-1]]
+    with pytest.raises(ValueError, match="already exists"):
+        merge_effdirs([a, a], "error")
+
+    kept, collisions = merge_effdirs([a, a], "keep")
+    assert [e["str"] for e in kept["sec"][13]["entry"][:-1]] == names * 2
+    assert [c["renamed"] for c in collisions] == [None] * len(names)
+
+    renamed, collisions = merge_effdirs([a, a, a], "rename")
+    out_names = [e["str"] for e in renamed["sec"][13]["entry"][:-1]]
+    assert out_names == names + [f"{n}_2" for n in names] + [f"{n}_3" for n in names]
+    assert [c["input"] for c in collisions] == [1] * len(names) + [2] * len(names)
+    e = renamed["sec"][13]["entry"][len(names)]
+    assert e["str_rep"] == len(e["str"])
+    reread = parse_effdir(bytes(effdir_to_bytes(renamed)))
+    assert [e["str"] for e in reread["sec"][13]["entry"][:-1]] == out_names
+
+def test_merge_over_an_input(effdir_file, other_effdir_file, monkeypatch):
+    expected = effdir_to_bytes(merge_effdirs([read_effdir(other_effdir_file), read_effdir(effdir_file)])[0])
+    loads = []
+    def load(path, **kwargs):
+        loads.append(kwargs)
+        return read_effdir(path, **kwargs)
+    monkeypatch.setattr(effdir_merge, "read_effdir", load)
+    merge_files([other_effdir_file, effdir_file], effdir_file)
+    assert open(effdir_file, "rb").read() == expected
+    # a mapped input cannot be overwritten on Windows
+    assert len(loads) == 2 and not any(kw.get("use_mmap") for kw in loads)
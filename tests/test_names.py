@@ -0,0 +1,56 @@
+from fnmatch import fnmatchcase
+
+import pytest
+
+from effdir_cli import build_parser, run_command
+from effdir_index import index_path
+from effdir_names import find_effects, load_name_index, match_one
+from read_effdir import read_effdir
+from write_effdir import write_effdir
+
+def _expected(effdir, match):
+    n12 = len(effdir["sec"][12]["entry"])
+    return [{"index": i + 1, "name": e["str"]}
+            for i, e in enumerate(effdir["sec"][13]["entry"][:n12]) if match(e["str"])]
+
+PATTERNS = [
+    ("fx1*", "glob", lambda s: fnmatchcase(s, "fx1*")),
+    ("fx?_*", "glob", lambda s: fnmatchcase(s, "fx?_*")),
+    ("*_[a-c]*", "glob", lambda s: fnmatchcase(s, "*_[a-c]*")),
+    ("fx1", "prefix", lambda s: s.startswith("fx1")),
+    ("fx", "prefix", lambda s: s.startswith("fx")),
+    ("fx12_iss", "exact", lambda s: s == "fx12_iss"),
+    ("fx12", "exact", lambda s: s == "fx12"),
+]
+
+@pytest.mark.parametrize("pattern, mode, match", PATTERNS)
+def test_find_matches_full_read(effdir_file, pattern, mode, match):
+    expected = _expected(read_effdir(effdir_file), match)
+    assert find_effects(effdir_file, pattern, mode) == expected
+    # again from the names stored in the sidecar
+    assert find_effects(effdir_file, pattern, mode) == expected
+
+def test_find_follows_rewritten_file(effdir_file):
+    load_name_index(effdir_file)
+    assert '"names"' in open(index_path(effdir_file), encoding="utf-8").read()
+    effdir = read_effdir(effdir_file)
+    e = effdir["sec"][13]["entry"][3]
+    effdir["sec"][13]["entry"][3] = {**e, "str": "renamed", "str_rep": len("renamed")}
+    write_effdir(effdir, effdir_file)
+    assert find_effects(effdir_file, "ren*") == [{"index": 4, "name": "renamed"}]
+    assert find_effects(effdir_file, "fx3_*") == []
+
+def test_match_one(effdir_file):
+    assert match_one(effdir_file, "fx7_*") == 8
+    with pytest.raises(ValueError, match="matches 11 effects"):
+        match_one(effdir_file, "fx1*")
+    with pytest.raises(ValueError, match="matches 0 effects"):
+        match_one(effdir_file, "nothing*")
+
+def test_isolate_name_match_equals_index(effdir_file, tmp_path):
+    by_name, by_index = str(tmp_path / "name.effdir"), str(tmp_path / "index.effdir")
+    parser = build_parser()
+    run_command(parser.parse_args(["isolate", effdir_file, by_name, "--name-match", "fx7_*", "--name", "x"]))
+    run_command(parser.parse_args(["isolate", effdir_file, by_index, "--index", "8", "--name", "x"]))
+    assert open(by_name, "rb").read() == open(by_index, "rb").read()
+    assert read_effdir(by_name)["sec"][13]["entry"][0]["str"] == "x"
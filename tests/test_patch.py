@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from effdir_index import load_index
+from effdir_patch import parse_patch, patch_effdir
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes, write_effdir
+
+def _patched(path, section, i, field, value):
+    # expected result: full read -> edit -> write
+    effdir = read_effdir(path)
+    effdir["sec"][section]["entry"][i][field] = value
+    return bytes(effdir_to_bytes(effdir))
+
+def test_patch_rescans_a_file_replaced_behind_its_sidecar(effdir_file, tmp_path):
+    load_index(effdir_file)     # sidecar for the original layout
+    st = os.stat(effdir_file)
+    # same size, Section 14 one byte further on: a sec13 name grows, a sec15 one shrinks
+    effdir = read_effdir(effdir_file)
+    effdir["sec"][13]["entry"][0]["str"] += "x"
+    e15 = effdir["sec"][15]["entry"][0]
+    e15["str"] = e15["str"][:-1]
+    write_effdir(effdir, effdir_file)
+    os.utime(effdir_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert os.stat(effdir_file).st_size == st.st_size
+    expected = _patched(effdir_file, 14, 1, "group_prop", 7)
+    patch_effdir(effdir_file, [(14, 1, "group_prop", 7)])
+    assert open(effdir_file, "rb").read() == expected
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_patch_matches_full_rewrite(effdir_file, use_mmap):
+    effdir = read_effdir(effdir_file)
+    e12 = next(i for i, e in enumerate(effdir["sec"][12]["entry"]) if e["prim_indx"])
+    effdir["sec"][14]["entry"][3]["group_prop"] = 7
+    effdir["sec"][2]["entry"][0]["speed"] = 1.5
+    effdir["sec"][1]["entry"][2]["more_dw"][3] = 0xDEADBEEF
+    effdir["sec"][12]["entry"][e12]["prim_indx"][0]["u3a"] = 42
+    effdir["sec"][9]["entry"][1]["u1"] = 0x010203040506
+    expected = bytes(effdir_to_bytes(effdir))
+    report = patch_effdir(effdir_file, [
+        (14, 3, "group_prop", 7),
+        (2, 0, "speed", "1.5"),
+        (1, 2, "more_dw.3", "0xDEADBEEF"),
+        {"section": 12, "index": e12, "field": "prim_indx.0.u3a", "value": 42},
+        (9, 1, "u1", 0x010203040506),
+    ], use_mmap=use_mmap)
+    assert report["patched"] == 5
+    assert open(effdir_file, "rb").read() == expected
+
+@pytest.mark.parametrize("field, message", [
+    ("str", "is a string"),
+    ("str_rep", "is a length field"),
+    ("nope", "no field"),
+])
+def test_patch_rejects_fields_that_are_not_fixed_width(effdir_file, field, message):
+    before = open(effdir_file, "rb").read()
+    with pytest.raises(ValueError, match=message):
+        patch_effdir(effdir_file, [(14, 0, "group_prop", 1), (14, 0, field, 3)])
+    # validated before the first byte is written
+    assert open(effdir_file, "rb").read() == before
+
+@pytest.mark.parametrize("patch", [
+    (1, 0, "list_resource_keys_rep", 1),
+    (12, 0, "prim_indx_rep", 0),
+    (2, 0, "speed", "fast"),
+    (14, 0, "group_prop", -1),
+    (7, 0, "u1_raw", "00"),
+    (14, 10 ** 6, "group_prop", 1),
+])
+def test_patch_rejects_length_fields_and_bad_values(effdir_file, patch):
+    before = open(effdir_file, "rb").read()
+    with pytest.raises((ValueError, IndexError)):
+        patch_effdir(effdir_file, [patch])
+    assert open(effdir_file, "rb").read() == before
+
+def test_parse_patch():
+    assert parse_patch("12:0:prim_indx.1.indx_key=4") == (12, 0, "prim_indx.1.indx_key", "4")
+    with pytest.raises(ValueError):
+        parse_patch("12:0:speed")
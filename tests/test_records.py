@@ -0,0 +1,19 @@
+import io
+import json
+
+from effdir_json import dump_effdir
+from read_effdir import read_effdir
+
+def test_records_equal_plain_entries(effdir_file):
+    plain = read_effdir(effdir_file)
+    records = read_effdir(effdir_file, records=True)
+    for nr in range(1, 16):
+        assert records["sec"][nr].get("entry", []) == plain["sec"][nr].get("entry", [])
+
+def test_records_dump_as_json(effdir_file):
+    out = {}
+    for records in (False, True):
+        buf = io.StringIO()
+        dump_effdir(read_effdir(effdir_file, records=records), buf, fmt="compact")
+        out[records] = json.loads(buf.getvalue())
+    assert out[True] == out[False]
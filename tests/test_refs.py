@@ -0,0 +1,20 @@
+import pytest
+
+from effdir_refs import RefGraph
+from read_effdir import read_effdir
+
+@pytest.mark.parametrize("secondary", [False, True])
+def test_effects_using_matches_closure(effdir_file, secondary):
+    g = RefGraph(read_effdir(effdir_file))
+    effects = range(g.n_entries[13] - 1)
+    closures = {i: g.closure([(13, i)], secondary) for i in effects}
+    nodes = set().union(*closures.values())
+    assert any(g.secondary.values())
+    for node in nodes:
+        assert g.effects_using(node, secondary) == [i for i in effects if node in closures[i]]
+
+def test_secondary_edges_are_opt_in(effdir_file):
+    g = RefGraph(read_effdir(effdir_file))
+    src, targets = next((n, t) for n, t in g.secondary.items() if t)
+    assert src not in g.referrers(targets[0])
+    assert src in g.referrers(targets[0], secondary=True)
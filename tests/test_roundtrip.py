@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import effdir_parallel
+from effdir_index import index_path
+from read_effdir import read_effdir
+from synth_effdir import generate_effdir
+from write_effdir import effdir_to_bytes
+
+MODES = {
+    "default": {},
+    "mmap": {"use_mmap": True},
+    "columnar": {"columnar": True},
+    "curves": {"curves": True},
+    "records": {"records": True},
+    "records+curves": {"records": True, "curves": True},
+    "spans": {"spans": True},
+    "processes": {"processes": 2},
+}
+
+@pytest.fixture(params=[
+    {"entries": 20, "curve_len": 4, "str_len": 8, "fanout": 4, "seed": 1},
+    {"entries": {1: 3, 12: 5, 14: 2}, "curve_len": 0, "str_len": 0, "fanout": 2, "seed": 2},
+    {"entries": 0, "seed": 3},
+], ids=["full", "sparse", "empty"])
+def synth_file(request, tmp_path):
+    data = generate_effdir(**request.param)
+    path = tmp_path / "synth.effdir"
+    path.write_bytes(data)
+    return str(path), data
+
+@pytest.mark.parametrize("mode", MODES)
+def test_synth_read_write_round_trip(synth_file, mode, monkeypatch):
+    if mode == "columnar":
+        pytest.importorskip("numpy")
+    if mode == "processes":
+        monkeypatch.setattr(effdir_parallel, "PARALLEL_MIN_BYTES", 0)
+    path, data = synth_file
+    assert bytes(effdir_to_bytes(read_effdir(path, **MODES[mode]))) == data
+
+def test_parallel_read_leaves_no_sidecar(effdir_file, monkeypatch):
+    monkeypatch.setattr(effdir_parallel, "PARALLEL_MIN_BYTES", 0)
+    assert read_effdir(effdir_file, processes=2) == read_effdir(effdir_file)
+    assert not os.path.exists(index_path(effdir_file))
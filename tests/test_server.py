@@ -0,0 +1,71 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from effdir_server import EffdirServer
+from isolate_eff import isolate_eff
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+@pytest.fixture
+def server():
+    srv = EffdirServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def _post(srv, path, body, **headers):
+    url = f"http://127.0.0.1:{srv.server_address[1]}{path}"
+    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {srv.token}", **headers}
+    req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"),
+                                 headers={k: v for k, v in headers.items() if v is not None})
+    with urllib.request.urlopen(req) as resp:
+        return resp.read()
+
+def test_isolate_round_trip(server, effdir_file, tmp_path):
+    expected = bytes(effdir_to_bytes(isolate_eff(read_effdir(effdir_file), 2, "iso")))
+    # twice: the second run works on the cached, read-only effdir
+    for _ in range(2):
+        assert _post(server, "/isolate", {"input": effdir_file, "index": 2, "name": "iso"}) == expected
+
+    out = str(tmp_path / "run.effdir")
+    reply = json.loads(_post(server, "/run", {"argv": ["isolate", effdir_file, out, "--index", "2",
+                                                       "--name", "iso"]}))
+    assert reply["exit"] == 0, reply["stderr"]
+    with open(out, "rb") as f:
+        assert f.read() == expected
+
+@pytest.mark.parametrize("argv", [
+    ["isolate", "{in}", "{out}", "--effects", "1", "2"],
+    ["isolate-many", "{in}", "1={out}"],
+    ["dedupe", "{in}", "{out}"],
+])
+def test_write_commands_on_cached_effdir(server, effdir_file, tmp_path, argv):
+    out = str(tmp_path / "out.effdir")
+    argv = [a.format(**{"in": effdir_file, "out": out}) for a in argv]
+    reply = json.loads(_post(server, "/run", {"argv": argv}))
+    assert reply["exit"] == 0, reply["stderr"]
+    read_effdir(out)
+
+@pytest.mark.parametrize("headers, status", [
+    ({"Authorization": None}, 401),
+    ({"Authorization": "Bearer wrong"}, 401),
+    ({"Content-Type": "text/plain"}, 415),
+    ({"Origin": "http://evil.example"}, 403),
+    ({"Host": "evil.example"}, 403),
+])
+def test_refuses_untrusted_requests(server, tmp_path, headers, status):
+    victim = tmp_path / "victim.txt"
+    victim.write_text("keep")
+    argv = ["merge", str(victim), str(victim)]
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        _post(server, "/run", {"argv": argv}, **headers)
+    assert exc.value.code == status
+    with pytest.raises(urllib.error.HTTPError):
+        _post(server, "/shutdown", {}, **headers)
+    assert victim.read_text() == "keep"
@@ -0,0 +1,63 @@
+import copy
+
+import pytest
+
+from effdir_spans import entry_span
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+def _set_speed(eff):
+    eff["sec"][2]["entry"][3]["speed"] = 2.0
+    return [(2, 3)]
+
+def _nested_dict(eff):
+    eff["sec"][12]["entry"][1]["prim_indx"][0]["u1"] = 0.5
+    return [(12, 1)]
+
+def _nested_list(eff):
+    eff["sec"][1]["entry"][4]["spiral_reps"][0][1] = 1.25
+    eff["sec"][1]["entry"][5]["more_dw"].reverse()
+    return [(1, 4), (1, 5)]
+
+def _dict_methods(eff):
+    eff["sec"][14]["entry"][0].update(group_prop=7)
+    eff["sec"][14]["entry"][2].setdefault("group_prop", 0)   # existing key, value kept
+    eff["sec"][12]["entry"][2]["sec_indx"][0].update(u1=1)
+    return [(14, 0), (14, 2), (12, 2)]
+
+def _moved_list(eff):
+    # a list moved into another entry stays bound to the one it was read with
+    a, b = eff["sec"][1]["entry"][6], eff["sec"][1]["entry"][7]
+    b["next_list"] = a["next_list"]
+    a["next_list"][0] = 9
+    return [(1, 6), (1, 7)]
+
+def _replaced_entry(eff):
+    # a deep copy is a plain dict, encoded from its fields
+    entries = eff["sec"][15]["entry"]
+    entries[0] = copy.deepcopy(entries[1])
+    return [(15, 0)]
+
+EDITS = [_set_speed, _nested_dict, _nested_list, _dict_methods, _moved_list, _replaced_entry]
+
+@pytest.mark.parametrize("edit", EDITS, ids=[f.__name__.strip("_") for f in EDITS])
+def test_edit_marks_entry_dirty(effdir_file, edit):
+    spans, plain = read_effdir(effdir_file, spans=True), read_effdir(effdir_file)
+    dirty = edit(spans)
+    assert edit(plain) == dirty
+    for nr, sec in spans["sec"].items():
+        for i, e in enumerate(sec["entry"]):
+            assert (entry_span(e) is None) == ((nr, i) in dirty), (nr, i)
+    # the byte copies plus the re-encoded entries give what a full rewrite does
+    assert bytes(effdir_to_bytes(spans)) == bytes(effdir_to_bytes(plain))
+    assert bytes(effdir_to_bytes(plain)) != open(effdir_file, "rb").read()
+
+def test_unmodified_write_is_the_source(effdir_file):
+    spans = read_effdir(effdir_file, spans=True, use_mmap=True)
+    assert bytes(effdir_to_bytes(spans)) == open(effdir_file, "rb").read()
+    assert type(copy.copy(spans["sec"][2]["entry"][0])) is dict
+
+@pytest.mark.parametrize("mode", ["curves", "records", "columnar"])
+def test_spans_reject_untracked_modes(effdir_file, mode):
+    with pytest.raises(ValueError, match="spans cannot be combined"):
+        read_effdir(effdir_file, spans=True, **{mode: True})
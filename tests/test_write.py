@@ -0,0 +1,22 @@
+import pytest
+
+from read_effdir import read_effdir
+from write_effdir import effdir_to_bytes
+
+def test_entry_count_must_match_n_entries(effdir_file):
+    effdir = read_effdir(effdir_file)
+    effdir["sec"][2]["entry"].pop()
+    with pytest.raises(ValueError, match="section 2"):
+        effdir_to_bytes(effdir)
+
+def test_section13_needs_closing_entry(effdir_file):
+    effdir = read_effdir(effdir_file)
+    effdir["sec"][13]["entry"].pop()
+    with pytest.raises(ValueError, match="section 13"):
+        effdir_to_bytes(effdir)
+
+def test_extra_entries_are_not_dropped(effdir_file):
+    effdir = read_effdir(effdir_file)
+    effdir["sec"][14]["entry"].append(dict(effdir["sec"][14]["entry"][0]))
+    with pytest.raises(ValueError, match="section 14"):
+        effdir_to_bytes(effdir)